@@ -0,0 +1,438 @@
+import os
+import re
+import sys
+import json
+import time
+import types
+import random
+import sqlite3
+import logging
+import argparse
+import tempfile
+import threading
+from collections import Counter
+
+# Benchmark do pipeline sem rede: Reddit, Ollama e tradutor são substituídos por backends locais
+# com latência configurável, e o corpus é sintético (com o formato dos bancos *_posts.db).
+
+# Formato usado quando não há bancos para amostrar.
+DEFAULT_SHAPE = {
+    "selftext_lengths": [700, 1500, 2500, 4000, 8000],
+    "comment_counts": [0, 5, 15, 30, 60],
+    "comment_lengths": [40, 120, 250, 600],
+    "vocabulary": [
+        "study", "exam", "practice", "labs", "privilege", "escalation", "active", "directory",
+        "enumeration", "notes", "report", "time", "passed", "machine", "box", "hours", "book",
+        "questions", "domain", "review", "the", "and", "to", "i", "a", "of", "it", "was",
+    ],
+}
+
+class LatencyRecorder:
+    """
+    Registra a duração de cada chamada aos backends falsos, por backend.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+
+    def record(self, name, seconds):
+        with self._lock:
+            self.samples.setdefault(name, []).append(seconds)
+
+    def reset(self):
+        with self._lock:
+            self.samples = {}
+
+    def percentiles(self, name):
+        """
+        Retorna (chamadas, p50, p95) em segundos para o backend.
+        """
+        with self._lock:
+            values = sorted(self.samples.get(name, []))
+        if not values:
+            return 0, None, None
+        return len(values), values[len(values) // 2], values[min(len(values) - 1, int(len(values) * 0.95))]
+
+RECORDER = LatencyRecorder()
+
+def simulate_call(name, latency):
+    """
+    Simula a latência de rede/inferência de uma chamada e registra a duração.
+    """
+    start = time.perf_counter()
+    if latency > 0:
+        time.sleep(latency)
+    RECORDER.record(name, time.perf_counter() - start)
+
+def load_corpus_shape(db_files):
+    """
+    Amostra o formato do corpus real (tamanho dos posts, comentários por post, tamanho dos
+    comentários e vocabulário) a partir dos bancos informados. Usa DEFAULT_SHAPE se não houver dados.
+    """
+    shape = {"selftext_lengths": [], "comment_counts": [], "comment_lengths": [], "vocabulary": []}
+    words = Counter()
+    for db_file in db_files:
+        if not os.path.exists(db_file):
+            continue
+        conn = sqlite3.connect(db_file)
+        try:
+            for selftext, comment_count in conn.execute('''
+                SELECT p.selftext, (SELECT COUNT(*) FROM comments c WHERE c.post_id = p.id)
+                FROM posts p
+            '''):
+                shape["selftext_lengths"].append(len(selftext or ""))
+                shape["comment_counts"].append(comment_count)
+                words.update(re.findall(r"[a-z']+", (selftext or "").lower()))
+            for (length,) in conn.execute("SELECT LENGTH(comment_body) FROM comments"):
+                shape["comment_lengths"].append(length or 0)
+        finally:
+            conn.close()
+    shape["vocabulary"] = [word for word, _ in words.most_common(2000)]
+    for key, default in DEFAULT_SHAPE.items():
+        if not shape[key]:
+            shape[key] = default
+    return shape
+
+class FakeComment:
+    def __init__(self, comment_id, body, created_utc):
+        self.id = comment_id
+        self.body = body
+        self.created_utc = created_utc
+
+class FakeCommentForest:
+    """
+    Imita submission.comments do PRAW; os comentários são gerados só quando lidos.
+    """
+
+    def __init__(self, post):
+        self.post = post
+
+    def replace_more(self, limit=0):
+        pass
+
+    def list(self):
+        return self.post.corpus.comments_for(self.post)
+
+class FakeSubmission:
+    """
+    Imita um praw.models.Submission; o corpo é uma fatia do texto-base do corpus.
+    """
+
+    def __init__(self, corpus, index, created_utc, num_comments, selftext_length):
+        self.corpus = corpus
+        self.index = index
+        self.id = f"b{index:06d}"
+        self.title = f"Passed after {index % 12 + 1} months of study"
+        self.url = f"https://www.reddit.com/r/bench/comments/{self.id}/"
+        self.created_utc = created_utc
+        self.num_comments = num_comments
+        self.selftext_length = selftext_length
+        self.comments = FakeCommentForest(self)
+
+    @property
+    def selftext(self):
+        return self.corpus.text_slice(self.index, self.selftext_length)
+
+class SyntheticCorpus:
+    """
+    Corpus sintético e determinístico (semente fixa) de posts e comentários.
+    Tamanhos vêm do formato amostrado ou dos valores fixos informados.
+    """
+
+    def __init__(self, num_posts, shape, seed=0, comments_per_post=None, selftext_chars=None,
+                 comment_chars=None):
+        rng = random.Random(seed)
+        self.seed = seed
+        self.comment_lengths = [comment_chars] if comment_chars else shape["comment_lengths"]
+        # Texto-base de onde saem todos os corpos, para não gerar palavra a palavra por post.
+        words = [rng.choice(shape["vocabulary"]) for _ in range(200000)]
+        self.base_text = " ".join(words)
+        start = 1672531200  # 2023-01-01
+        self.posts = []
+        for index in range(num_posts):
+            num_comments = comments_per_post if comments_per_post is not None else rng.choice(shape["comment_counts"])
+            length = selftext_chars or rng.choice(shape["selftext_lengths"])
+            created_utc = start + index * 600 + rng.randint(0, 599)
+            self.posts.append(FakeSubmission(self, index, created_utc, num_comments, length))
+        self.by_id = {post.id: post for post in self.posts}
+
+    def text_slice(self, offset_seed, length):
+        offset = (offset_seed * 7919) % max(1, len(self.base_text) - length)
+        return self.base_text[offset:offset + length]
+
+    def comments_for(self, post):
+        rng = random.Random(self.seed * 1000003 + post.index)
+        return [
+            FakeComment(f"{post.id}c{i}", self.text_slice(post.index * 31 + i, rng.choice(self.comment_lengths)),
+                        post.created_utc + i)
+            for i in range(post.num_comments)
+        ]
+
+class FakeSubreddit:
+    """
+    Imita subreddit.search do PRAW: do mais novo para o mais antigo, páginas de 100 itens.
+    """
+
+    def __init__(self, corpus, latency):
+        self.corpus = corpus
+        self.latency = latency
+
+    def search(self, query, sort="new", time_filter="all", limit=None):
+        posts = sorted(self.corpus.posts, key=lambda post: post.created_utc, reverse=True)[:limit]
+        for i, post in enumerate(posts):
+            if i % 100 == 0:
+                simulate_call("reddit.listing", self.latency)
+            yield post
+
+class FakeAuth:
+    def __init__(self):
+        self.limits = {"remaining": 10 ** 9, "reset_timestamp": time.time() + 600, "used": 0}
+
+class FakeReddit:
+    """
+    Imita praw.Reddit para a coleta: subreddit(), submission() e auth.limits.
+    """
+    corpus = None
+    latency = 0.0
+
+    def __init__(self, **kwargs):
+        self.auth = FakeAuth()
+
+    def subreddit(self, name):
+        return FakeSubreddit(self.corpus, self.latency)
+
+    def submission(self, id=None):
+        simulate_call("reddit.submission", self.latency)
+        return self.corpus.by_id[id]
+
+class FakeOllama:
+    """
+    Imita ollama.generate: responde com um bloco <think> e um texto de tamanho fixo.
+    """
+    latency = 0.0
+    output_chars = 600
+
+    @classmethod
+    def response_text(cls):
+        return "<think>raciocínio</think>\n" + ("- study note " * (cls.output_chars // 13 + 1))[:cls.output_chars]
+
+    @classmethod
+    def generate(cls, model=None, prompt="", options=None, stream=False, **kwargs):
+        simulate_call("ollama.generate", cls.latency)
+        text = cls.response_text()
+        stats = {"prompt_eval_count": len(prompt) // 3, "eval_count": len(text) // 3,
+                 "eval_duration": int(cls.latency * 1e9)}
+        if not stream:
+            return {"response": text, "done": True, **stats}
+
+        def parts():
+            for i in range(0, len(text), 16):
+                yield {"response": text[i:i + 16], "done": False}
+            yield {"response": "", "done": True, **stats}
+        return parts()
+
+class FakeOllamaClient:
+    """
+    Imita ollama.Client (usado pelo OllamaPool) com as respostas de FakeOllama.
+    """
+
+    def __init__(self, host=None, **kwargs):
+        self.host = host
+
+    def generate(self, **kwargs):
+        return FakeOllama.generate(**kwargs)
+
+class FakeGoogleTranslator:
+    """
+    Imita deep_translator.GoogleTranslator: devolve o texto marcado, após a latência configurada.
+    """
+    latency = 0.0
+
+    def __init__(self, source="auto", target="pt"):
+        self.target = target
+
+    def translate(self, text):
+        simulate_call("translator", self.latency)
+        return f"[{self.target}] {text}"
+
+def install_fake_backends(reddit_latency, ollama_latency, ollama_output_chars, translator_latency):
+    """
+    Registra os backends falsos no lugar de praw, ollama e deep_translator. Deve ser chamado antes
+    de importar os módulos do pipeline, para que nenhuma chamada saia da máquina.
+    """
+    FakeReddit.latency = reddit_latency
+    FakeOllama.latency = ollama_latency
+    FakeOllama.output_chars = ollama_output_chars
+    FakeGoogleTranslator.latency = translator_latency
+    praw = types.ModuleType("praw")
+    praw.Reddit = FakeReddit
+    ollama = types.ModuleType("ollama")
+    ollama.generate = FakeOllama.generate
+    ollama.Client = FakeOllamaClient
+    deep_translator = types.ModuleType("deep_translator")
+    deep_translator.GoogleTranslator = FakeGoogleTranslator
+    sys.modules.update({"praw": praw, "ollama": ollama, "deep_translator": deep_translator})
+
+def build_report_text(paragraphs, shape, seed=0):
+    """
+    Gera um relatório em markdown (em inglês) do tamanho informado, para a etapa de tradução.
+    """
+    rng = random.Random(seed)
+    sections = []
+    for i in range(paragraphs):
+        words = " ".join(rng.choice(shape["vocabulary"]) for _ in range(rng.randint(20, 80)))
+        sections.append(f"{i + 1}️⃣ **Strategy {i + 1}**\n- 🔹 **Resources:** the {words}.")
+    return "\n\n".join(sections)
+
+def measure(results, posts, stage, mode, items, fn, backend=None):
+    """
+    Executa fn() medindo o tempo total e, se houver backend, a latência por chamada.
+    """
+    RECORDER.reset()
+    start = time.perf_counter()
+    value = fn()
+    seconds = time.perf_counter() - start
+    row = {
+        "posts": posts, "stage": stage, "mode": mode, "items": items(value) if callable(items) else items,
+        "seconds": round(seconds, 4),
+    }
+    row["throughput"] = round(row["items"] / seconds, 1) if seconds > 0 else None
+    if backend:
+        calls, p50, p95 = RECORDER.percentiles(backend)
+        row.update({"calls": calls, "p50_ms": p50 and round(p50 * 1000, 2), "p95_ms": p95 and round(p95 * 1000, 2)})
+    results.append(row)
+    print(
+        f"{posts:>7} posts | {stage:<11} | {mode:<11} | {row['items']:>8} itens em {seconds:8.3f}s "
+        f"({row['throughput']} itens/s)"
+        + (f" | {row['calls']} chamadas, p50 {row['p50_ms']} ms, p95 {row['p95_ms']} ms" if backend else "")
+    )
+    return value
+
+def run_benchmark(num_posts, shape, args, work_dir):
+    """
+    Executa todas as etapas para um tamanho de corpus, nos modos serial e concorrente.
+    """
+    from insightsStore import setup_database, BulkWriter, iter_post_documents
+    from llmAnalysis import map_reduce_generate, chunk_documents, estimate_tokens
+    from ollamaPool import OllamaHost, OllamaPool
+    from redditCrawler import collect_posts, fetch_comment_forests
+    from translation import translate_document, make_google_backend
+
+    results = []
+    corpus = SyntheticCorpus(
+        num_posts, shape, seed=args.seed, comments_per_post=args.comments_per_post,
+        selftext_chars=args.selftext_chars, comment_chars=args.comment_chars
+    )
+    FakeReddit.corpus = corpus
+    reddit = FakeReddit()
+    modes = [("serial", 1, 1), ("concorrente", args.workers, args.llm_workers)]
+
+    posts, _ = measure(
+        results, num_posts, "listagem", "serial", lambda value: len(value[0]),
+        lambda: collect_posts(reddit.subreddit("bench"), "passed"), backend="reddit.listing"
+    )
+
+    forests = None
+    for mode, workers, _ in modes:
+        forests = measure(
+            results, num_posts, "comentários", mode, len(posts),
+            lambda: fetch_comment_forests(FakeReddit, posts, max_workers=workers),
+            backend="reddit.submission"
+        )
+
+    db_file = os.path.join(work_dir, f"bench_{num_posts}.db")
+    conn = setup_database(db_file)
+
+    def persist():
+        writer = BulkWriter(conn)
+        for post in posts:
+            writer.add_post(post)
+            if post.id in forests:
+                writer.add_forest(post, forests[post.id])
+        writer.close()
+        return writer.written["posts"] + writer.written["comments"]
+
+    measure(results, num_posts, "gravação", "lote", lambda rows: rows, persist)
+
+    def build_prompts():
+        documents = iter_post_documents(conn, include_comments=True)
+        return chunk_documents(documents, args.num_ctx - 2048 - estimate_tokens(extraction_prompt("")))
+
+    measure(results, num_posts, "prompts", "serial", lambda chunks: num_posts, build_prompts)
+
+    documents = list(iter_post_documents(conn, include_comments=True))
+    for mode, _, llm_workers in modes:
+        measure(
+            results, num_posts, "geração", mode, len(documents),
+            lambda: map_reduce_generate(
+                documents, extraction_prompt, report_prompt, num_ctx=args.num_ctx, max_workers=llm_workers,
+                pool=OllamaPool([OllamaHost(limit=llm_workers)])
+            ),
+            backend="ollama.generate"
+        )
+    conn.close()
+
+    report = build_report_text(args.report_paragraphs, shape, seed=args.seed)
+    for mode, workers, _ in modes:
+        measure(
+            results, num_posts, "tradução", mode, args.report_paragraphs,
+            lambda: translate_document(report, make_google_backend(), max_workers=workers),
+            backend="translator"
+        )
+    return results
+
+def extraction_prompt(posts_text):
+    return f"Liste em notas curtas as práticas de estudo citadas.\n\n**Relatos:**\n{posts_text}"
+
+def report_prompt(notes_text):
+    return f"Combine as notas em um relatório com 10 técnicas.\n\n**Dados:**\n{notes_text}"
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark do pipeline com corpus sintético e backends locais (sem rede)."
+    )
+    parser.add_argument("--posts", type=int, nargs="+", default=[100, 1000, 10000],
+                        help="Tamanhos de corpus a medir (ex.: 100 1000 10000 100000).")
+    parser.add_argument("--shape-from", nargs="*", default=["oscp_posts.db", "cissp_posts.db"],
+                        help="Bancos usados para amostrar o formato do corpus.")
+    parser.add_argument("--comments-per-post", type=int, help="Fixa o número de comentários por post.")
+    parser.add_argument("--selftext-chars", type=int, help="Fixa o tamanho do corpo dos posts.")
+    parser.add_argument("--comment-chars", type=int, help="Fixa o tamanho dos comentários.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--reddit-latency", type=float, default=0.005,
+                        help="Latência (s) por requisição ao Reddit falso.")
+    parser.add_argument("--ollama-latency", type=float, default=0.02,
+                        help="Latência (s) por chamada ao Ollama falso.")
+    parser.add_argument("--ollama-output-chars", type=int, default=600,
+                        help="Tamanho das respostas do Ollama falso.")
+    parser.add_argument("--translator-latency", type=float, default=0.005,
+                        help="Latência (s) por segmento no tradutor falso.")
+    parser.add_argument("--workers", type=int, default=8, help="Threads do modo concorrente (Reddit e tradução).")
+    parser.add_argument("--llm-workers", type=int, default=4, help="Chamadas simultâneas ao Ollama no modo concorrente.")
+    parser.add_argument("--num-ctx", type=int, default=8192)
+    parser.add_argument("--report-paragraphs", type=int, default=200,
+                        help="Tamanho (em parágrafos) do relatório traduzido.")
+    parser.add_argument("--json", help="Grava os resultados neste arquivo JSON.")
+    parser.add_argument("--verbose", action="store_true", help="Mostra os logs do pipeline.")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+    install_fake_backends(args.reddit_latency, args.ollama_latency, args.ollama_output_chars,
+                          args.translator_latency)
+    shape = load_corpus_shape(args.shape_from)
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench_") as work_dir:
+        for num_posts in args.posts:
+            results.extend(run_benchmark(num_posts, shape, args, work_dir))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -1,120 +1,37 @@
-import os
-import praw
-import sqlite3
-import logging
-from datetime import datetime, timezone
-import ollama
-import re
-
-# Biblioteca para tradução
-from deep_translator import GoogleTranslator
-
-def setup_logging():
-    """
-    Configura o logging para o script.
-    """
-    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Configuração e prompts do CISSP; coleta, análise e tradução ficam no pipeline compartilhado
+from examPipeline import run_single_exam
 
-def load_api_keys():
-    """
-    Carrega as API keys a partir das variáveis de ambiente (apenas do Reddit).
-    """
-    CLIENT_ID = os.getenv("REDDIT_CLIENT_ID")
-    CLIENT_SECRET = os.getenv("REDDIT_CLIENT_SECRET")
-    USER_AGENT = os.getenv("REDDIT_USER_AGENT")
+# Quantidade de resultados da busca (os mais recentes) usados na análise
+MAX_POSTS = 100
 
-    if not all([CLIENT_ID, CLIENT_SECRET, USER_AGENT]):
-        raise ValueError("❌ Missing Reddit API keys! Verifique as variáveis de ambiente.")
-    return CLIENT_ID, CLIENT_SECRET, USER_AGENT
+# Termos que indicam um relato informativo, com pesos para o ranking de relevância
+# (não filtram a coleta; ver --token-budget)
+RANK_KEYWORDS = {
+    "domain": 1.0, "practice questions": 1.5, "boson": 1.5, "sybex": 1.5, "official study guide": 1.5,
+    "destination certification": 1.5, "think like a manager": 2.0, "flashcards": 1.0,
+    "study plan": 1.5, "hours": 0.5, "weeks": 0.5, "cat": 1.0, "mindmap": 1.5,
+}
 
-def initialize_reddit(client_id, client_secret, user_agent):
+def build_cissp_extraction_prompt(posts_text):
     """
-    Inicializa a API do Reddit utilizando a biblioteca PRAW.
+    Prompt da etapa map: extrai, de um lote de relatos, as práticas citadas em forma de notas curtas.
     """
-    return praw.Reddit(
-        client_id=client_id,
-        client_secret=client_secret,
-        user_agent=user_agent
-    )
+    return f"""
+Você está lendo um lote de relatos de candidatos aprovados no CISSP.
+Liste, em notas curtas, todos os livros, cursos, simulados, estratégias de estudo e memorização
+por domínio, erros comuns, dicas de gestão de tempo no exame e formas de lidar com questões complexas
+mencionados.
+Para cada item, indique quantos relatos do lote o citam e um exemplo concreto.
+Não escreva introdução nem conclusão.
 
-def setup_database(db_file="cissp_posts.db"):
-    """
-    Configura o banco de dados SQLite e cria as tabelas necessárias para posts e comentários.
-    """
-    conn = sqlite3.connect(db_file)
-    cur = conn.cursor()
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS posts (
-            id TEXT PRIMARY KEY,
-            title TEXT,
-            selftext TEXT,
-            url TEXT,
-            created_utc REAL
-        );
-    ''')
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS comments (
-            id TEXT PRIMARY KEY,
-            post_id TEXT,
-            comment_body TEXT,
-            created_utc REAL,
-            FOREIGN KEY (post_id) REFERENCES posts (id)
-        );
-    ''')
-    conn.commit()
-    return conn
-
-def collect_posts(subreddit, search_query, limit=100):
-    """
-    Coleta posts do subreddit com base em um termo de busca.
-    - limit define quantos resultados você quer pegar, até 100, 200 etc.
-    - sort="new" para pegar os mais recentes (ou "relevance", etc.)
-    - time_filter="all" para pegar de qualquer período.
-    """
-    posts = []
-    for post in subreddit.search(search_query, sort="new", time_filter="all", limit=limit):
-        posts.append(post)
-    return posts
+**Relatos:**
+{posts_text}
+"""
 
-def save_posts_to_db(conn, posts):
-    """
-    Salva os posts e *opcionalmente* seus comentários no banco de dados SQLite.
-    """
-    cur = conn.cursor()
-    for post in posts:
-        try:
-            cur.execute('''
-                INSERT OR IGNORE INTO posts (id, title, selftext, url, created_utc)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (post.id, post.title, post.selftext, post.url, post.created_utc))
-        except Exception as e:
-            logging.error(f"Erro ao salvar o post {post.id}: {e}")
-
-        # Se você não quer salvar comentários, basta comentar o bloco abaixo.
-        # Caso queira armazená-los no banco mas não analisá-los, deixe esse bloco.
-        try:
-            post.comments.replace_more(limit=0)
-            for comment in post.comments.list():
-                try:
-                    cur.execute('''
-                        INSERT OR IGNORE INTO comments (id, post_id, comment_body, created_utc)
-                        VALUES (?, ?, ?, ?)
-                    ''', (comment.id, post.id, comment.body, getattr(comment, 'created_utc', None)))
-                except Exception as e:
-                    logging.error(f"Erro ao salvar o comentário {comment.id}: {e}")
-        except Exception as e:
-            logging.error(f"Erro ao processar comentários do post {post.id}: {e}")
-
-    conn.commit()
-
-def analyze_cissp_success(posts_text):
+def build_cissp_report_prompt(notes_text):
     """
-    Utiliza a biblioteca ollama para enviar o prompt ao Ollama (LLM local).
-    Retorna o texto processado como resposta, focado em dicas e estratégias para CISSP.
+    Prompt da etapa reduce: combina as notas de todos os lotes no relatório final.
     """
-    # Instância do cliente Ollama
-    client = ollama.Client()
-
     # Prompt "system" e "user"
     system_prompt = (
         "Você é um mentor de cibersegurança corporativa com 15 anos de experiência em segurança da informação e CISSP.\n\n"
@@ -145,85 +62,31 @@ para futuros estudantes, baseando-se em estratégias, livros de estudo, simulado
 
 **Extraia exatamente 10 técnicas ou práticas de estudo que aparecem com maior frequência.**
 
-**Dados:** 
-{posts_text}
+**Dados** (anotações extraídas dos relatos, lote a lote):
+{notes_text}
 """
 
-    final_prompt = system_prompt + user_prompt
-
-    try:
-        response = ollama.generate(
-            model="deepseek-r1",  # Ajuste para o modelo que você estiver usando
-            prompt=final_prompt
-        )
-        return response["response"]
-    except Exception as e:
-        logging.error(f"Erro ao gerar resposta com Ollama: {e}")
-        return "Erro ao gerar resposta com Ollama."
-
-def remove_think_blocks(text):
-    """
-    Remove todo conteúdo que estiver entre <think>...</think>, incluindo as tags.
-    """
-    return re.sub(r"<think>.*?</think>", "", text, flags=re.DOTALL)
-
-def translate_to_portuguese(text):
-    """
-    Traduz o texto para Português usando deep-translator.
-    """
-    translator = GoogleTranslator(source='auto', target='pt')
-    return translator.translate(text)
-
-def main():
-    setup_logging()
-    
-    # Carrega as credenciais do Reddit
-    CLIENT_ID, CLIENT_SECRET, USER_AGENT = load_api_keys()
-    reddit = initialize_reddit(CLIENT_ID, CLIENT_SECRET, USER_AGENT)
-    subreddit = reddit.subreddit("cissp")
+    # Prompt final concatenando o "system prompt" e o "user prompt"
+    return system_prompt + user_prompt
 
+CISSP_EXAM = {
+    "name": "cissp",
+    "subreddit": "cissp",
     # Termo de busca (pode testar variações: "passed cissp", "I passed CISSP", etc.)
-    search_query = "passed cissp"
-
-    logging.info("Coletando posts...")
-    posts = collect_posts(subreddit, search_query, limit=100)
-    logging.info(f"Coletados {len(posts)} posts.")
-
-    # Configura o banco de dados SQLite e salva posts e comentários
-    conn = setup_database("cissp_posts.db")
-    logging.info("Salvando posts e comentários no banco de dados SQLite...")
-    save_posts_to_db(conn, posts)
-    logging.info("Dados salvos no banco de dados SQLite.")
+    "search_query": "passed cissp",
+    "limit": MAX_POSTS,
+    # Apenas os posts (título, corpo e url), sem comentários
+    "include_comments": False,
+    "rank_keywords": RANK_KEYWORDS,
+    "extraction_prompt": build_cissp_extraction_prompt,
+    "report_prompt": build_cissp_report_prompt,
+    "db_file": "cissp_posts.db",
+    "output_file": "cissp_success_analysis.txt",
+    "model": "deepseek-r1",
+}
 
-    # ======== AQUI: montar texto APENAS DOS POSTS (sem comentários) ========
-    post_texts = []
-    for post in posts:
-        # Criamos somente um resumo do post: titulo, corpo e url
-        post_info = f"Title: {post.title}\nBody: {post.selftext}\nURL: {post.url}\n"
-        post_texts.append(post_info)
-
-    # Juntar todo o texto em uma só string (cuidado com tamanho!)
-    full_text = "\n".join(post_texts)
-
-    # Se estiver muito grande, você pode limitar ou usar um método de "chunking"
-    # mas, para demonstração, vamos enviar tudo:
-    # full_text = full_text[:25000]  # Caso queira limitar
-
-    logging.info("Analisando posts com IA (Ollama)...")
-    cissp_analysis = analyze_cissp_success(full_text)
-
-    # Remove blocos <think> (caso existam)
-    cissp_analysis = remove_think_blocks(cissp_analysis)
-
-    # Tradução final para PT (caso o LLM responda em inglês ou mesclado)
-    cissp_analysis = translate_to_portuguese(cissp_analysis)
-
-    # Salvar análise em arquivo
-    ai_output_file = "cissp_success_analysis.txt"
-    with open(ai_output_file, "w", encoding="utf-8") as f:
-        f.write(cissp_analysis)
-
-    logging.info(f"Análise de IA concluída. Confira '{ai_output_file}' para os resultados.")
+def main():
+    run_single_exam(CISSP_EXAM, "Coleta e analisa histórias de sucesso do CISSP.")
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,771 @@
+import os
+import json
+import time
+import queue
+import logging
+import argparse
+import threading
+from itertools import islice
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import praw
+
+from insightsStore import (
+    setup_database, BulkWriter, posts_needing_comments, load_crawl_cursor, save_crawl_cursor,
+    iter_post_documents, keywords_to_match
+)
+from llmAnalysis import GENERATION_ERROR, map_reduce_generate, remove_think_blocks
+from llmCache import GenerationCache
+from ollamaPool import DEFAULT_KEEP_ALIVE, OllamaPool, parse_keep_alive
+from nearDuplicates import update_signatures, redundancy_report
+from postRanking import select_ranked_documents
+from redditCrawler import PostListing, CommentFetcher, crawl_cursor, fetch_comment_forests, RateLimitBudget
+from runCheckpoint import RunCheckpoint, latest_unfinished_run, save_run_posts
+from runMetrics import RunMetrics, profiled
+# Tradução em segmentos, com cache no banco (deep-translator por padrão)
+from translation import translate_to_portuguese
+
+# Valores padrão de uma entrada de configuração de exame.
+EXAM_DEFAULTS = {
+    "search_query": "passed",
+    "keywords": None,
+    "min_length": None,
+    "start_date": None,
+    "end_date": None,
+    "limit": None,
+    "include_comments": True,
+    # Só as N respostas diretas de maior pontuação de cada post (None: todos os comentários).
+    "top_comments": None,
+    "post_filter": None,
+    "rank_keywords": None,
+    "token_budget": None,
+    "model": "deepseek-r1",
+    # Geração no Ollama: contexto, tokens reservados para a resposta ao montar os lotes (e limite
+    # das extrações parciais; o relatório final não é cortado), outras opções do modelo
+    # (temperature, top_p, num_predict...) e por quanto tempo o modelo fica carregado (padrão:
+    # --keep-alive).
+    "num_ctx": 8192,
+    "num_predict": 2048,
+    "options": None,
+    "keep_alive": None,
+}
+
+# Gravações pendentes na fila da thread de escrita. Com a fila cheia, quem envia espera: a coleta
+# não se adianta à gravação e as árvores de comentários não se acumulam em memória.
+WRITER_QUEUE_SIZE = 64
+
+def setup_logging(multi_exam=False):
+    """
+    Configura o logging. Com vários exames simultâneos, cada linha indica a thread (o exame).
+    """
+    fmt = '%(asctime)s - %(levelname)s - %(message)s'
+    if multi_exam:
+        fmt = '%(asctime)s - %(levelname)s - [%(threadName)s] %(message)s'
+    logging.basicConfig(level=logging.INFO, format=fmt)
+
+def load_api_keys():
+    """
+    Carrega as API keys a partir das variáveis de ambiente (apenas do Reddit, neste caso).
+    """
+    CLIENT_ID = os.getenv("REDDIT_CLIENT_ID")
+    CLIENT_SECRET = os.getenv("REDDIT_CLIENT_SECRET")
+    USER_AGENT = os.getenv("REDDIT_USER_AGENT")
+
+    if not all([CLIENT_ID, CLIENT_SECRET, USER_AGENT]):
+        raise ValueError("❌ Missing Reddit API keys! Verifique as variáveis de ambiente.")
+    return CLIENT_ID, CLIENT_SECRET, USER_AGENT
+
+def initialize_reddit(client_id, client_secret, user_agent):
+    """
+    Inicializa a API do Reddit utilizando a biblioteca PRAW.
+    """
+    return praw.Reddit(
+        client_id=client_id,
+        client_secret=client_secret,
+        user_agent=user_agent
+    )
+
+def make_post_filter(keywords, min_length):
+    """
+    Cria um filtro de utilidade por palavras-chave (substring) e tamanho mínimo do selftext.
+    """
+    def is_useful_post(post):
+        content = f"{post.title} {post.selftext}".lower()
+        has_keyword = not keywords or any(keyword in content for keyword in keywords)
+        return has_keyword and (min_length is None or len(post.selftext) > min_length)
+    return is_useful_post
+
+def build_generic_extraction_prompt(title):
+    """
+    Cria o prompt da etapa map para exames sem prompt próprio.
+    """
+    def build(posts_text):
+        return f"""
+Você está lendo um lote de relatos de candidatos aprovados no {title}.
+Liste, em notas curtas, todos os recursos de estudo, ferramentas, estratégias, erros comuns e dicas
+de gestão de tempo mencionados.
+Para cada item, indique quantos relatos do lote o citam e um exemplo concreto.
+Não escreva introdução nem conclusão.
+
+**Relatos:**
+{posts_text}
+"""
+    return build
+
+def build_generic_report_prompt(title):
+    """
+    Cria o prompt da etapa reduce para exames sem prompt próprio.
+    """
+    def build(notes_text):
+        return f"""Você é um mentor de cibersegurança com 15 anos de experiência e conhece a fundo o {title}.
+
+Por favor, responda em PORTUGUES!
+
+Você está analisando histórias de sucesso do {title}. Seu objetivo é extrair **insights detalhados e acionáveis**
+para futuros estudantes, com base em técnicas reais de estudo, ferramentas e estratégias que funcionaram.
+
+**Estruture sua resposta assim:**
+
+1️⃣ **Estratégia Principal**
+- 🔹 **Recursos Recomendados:**
+- 🔹 **Ferramenta ou Método:**
+- 🔹 **Estratégia:**
+- 🔹 **Exemplo:**
+
+**Extraia exatamente 10 técnicas ou práticas de estudo que aparecem com maior frequência.**
+
+**Dados** (anotações extraídas dos relatos, lote a lote):
+{notes_text}
+"""
+    return build
+
+def template_prompt(template, placeholder):
+    """
+    Transforma um template de texto (com {posts_text} ou {notes_text}) em um construtor de prompt.
+    """
+    return lambda text: template.replace("{" + placeholder + "}", text)
+
+def exam_from_config(entry):
+    """
+    Completa uma entrada de configuração (ex.: lida de JSON) com os valores padrão.
+    Datas podem ser timestamps ou "AAAA-MM-DD"; prompts podem ser funções ou templates de texto.
+    """
+    exam = dict(EXAM_DEFAULTS)
+    exam.update(entry)
+    name = exam["name"]
+    title = exam.get("title", name.upper())
+    exam.setdefault("subreddit", name)
+    exam.setdefault("db_file", f"{name}_posts.db")
+    exam.setdefault("output_file", f"{name}_success_analysis.txt")
+    for field in ("start_date", "end_date"):
+        value = exam[field]
+        if isinstance(value, str):
+            date = datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+            if field == "end_date":
+                date = date.replace(hour=23, minute=59, second=59)
+            exam[field] = date.timestamp()
+    extraction_prompt = exam.get("extraction_prompt")
+    if extraction_prompt is None:
+        exam["extraction_prompt"] = build_generic_extraction_prompt(title)
+    elif isinstance(extraction_prompt, str):
+        exam["extraction_prompt"] = template_prompt(extraction_prompt, "posts_text")
+    report_prompt = exam.get("report_prompt")
+    if report_prompt is None:
+        exam["report_prompt"] = build_generic_report_prompt(title)
+    elif isinstance(report_prompt, str):
+        exam["report_prompt"] = template_prompt(report_prompt, "notes_text")
+    if exam["post_filter"] is None and (exam["keywords"] or exam["min_length"] is not None):
+        exam["post_filter"] = make_post_filter(exam["keywords"], exam["min_length"])
+    return exam
+
+def builtin_exams():
+    """
+    Retorna as configurações dos exames que têm script próprio (prompts sob medida).
+    """
+    from cisspInsights import CISSP_EXAM
+    from oscpInsights import OSCP_EXAM
+    return {"cissp": CISSP_EXAM, "oscp": OSCP_EXAM}
+
+def load_exams(names=None, config_file=None):
+    """
+    Monta a lista de exames a executar: os embutidos e os definidos em um arquivo JSON
+    (lista de objetos; entradas com o mesmo nome substituem as embutidas).
+    """
+    exams = dict(builtin_exams())
+    if config_file:
+        with open(config_file, encoding="utf-8") as f:
+            for entry in json.load(f):
+                base = exams.get(entry["name"], {})
+                exams[entry["name"]] = {**base, **entry}
+    if names:
+        missing = [name for name in names if name not in exams]
+        if missing:
+            raise ValueError(f"❌ Exames desconhecidos: {', '.join(missing)}")
+        exams = {name: exams[name] for name in names}
+    return [exam_from_config(exam) for exam in exams.values()]
+
+class DatabaseWriter:
+    """
+    Thread única responsável por todas as gravações de ingestão, em todos os bancos.
+    As outras threads enviam funções fn(conn); cada banco tem uma conexão, usada só por esta
+    thread, o que evita disputa de locks de escrita entre exames.
+    """
+
+    def __init__(self):
+        self.connections = {}
+        self.queue = queue.Queue(maxsize=WRITER_QUEUE_SIZE)
+        self.thread = threading.Thread(target=self.run, name="db-writer", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            db_file, fn, future = item
+            try:
+                if db_file not in self.connections:
+                    self.connections[db_file] = setup_database(db_file)
+                future.set_result(fn(self.connections[db_file]))
+            except Exception as e:
+                future.set_exception(e)
+        for conn in self.connections.values():
+            conn.close()
+
+    def submit(self, db_file, fn):
+        """
+        Enfileira fn(conn) para o banco db_file e retorna um Future com o resultado.
+        """
+        future = Future()
+        self.queue.put((db_file, fn, future))
+        return future
+
+    def call(self, db_file, fn):
+        """
+        Executa fn(conn) na thread de escrita e aguarda o resultado.
+        """
+        return self.submit(db_file, fn).result()
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+class SharedResources:
+    """
+    Recursos compartilhados por todos os exames de uma execução: credenciais e cliente do Reddit,
+    orçamento global de requisições, threads de coleta de comentários, thread de escrita no banco, servidores Ollama e pool de
+    chamadas ao Ollama (por padrão, com tantas threads quanto a capacidade somada dos servidores).
+    """
+
+    def __init__(self, args, offline=False):
+        self.args = args
+        self.writer = DatabaseWriter()
+        self.ollama = OllamaPool.from_specs(args.ollama_hosts, args.keep_alive)
+        self.llm_workers = args.llm_workers or self.ollama.capacity
+        self.llm_executor = ThreadPoolExecutor(max_workers=self.llm_workers, thread_name_prefix="ollama")
+        self.budget = RateLimitBudget()
+        self.listing_lock = threading.Lock()
+        # Id desta execução (compartilhado pelos exames), sob o qual os checkpoints são gravados.
+        # O padrão inclui microssegundos: execuções seguidas no mesmo segundo têm ids diferentes.
+        self.run_id = args.run_id or datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S-%f")
+        self.reddit = None
+        self.credentials = None
+        self.comment_fetcher = None
+        if not offline:
+            self.credentials = load_api_keys()
+            self.reddit = initialize_reddit(*self.credentials)
+            # Threads de coleta de comentários (com um cliente PRAW cada) reutilizadas por todos os
+            # lotes e exames.
+            self.comment_fetcher = CommentFetcher(self.reddit_factory, args.workers)
+
+    def reddit_factory(self):
+        """
+        Cria um cliente PRAW por thread de coleta (PRAW não é thread-safe), com as mesmas credenciais.
+        """
+        return initialize_reddit(*self.credentials)
+
+    def close(self):
+        if self.comment_fetcher is not None:
+            self.comment_fetcher.close()
+        self.llm_executor.shutdown()
+        self.ollama.log_stats()
+        self.writer.close()
+
+def batched(iterable, size):
+    """
+    Agrupa os itens de iterable em listas de até size itens, consumindo-o sob demanda.
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+def iter_listing(listing, lock, metrics):
+    """
+    Percorre a listagem segurando lock só durante cada avanço (a listagem usa o cliente PRAW
+    compartilhado entre os exames) e soma esse tempo na etapa "collect_posts".
+    """
+    iterator = iter(listing)
+    elapsed = 0.0
+    try:
+        while True:
+            start = time.perf_counter()
+            with lock:
+                post = next(iterator, None)
+            elapsed += time.perf_counter() - start
+            if post is None:
+                return
+            yield post
+    finally:
+        metrics.add_time("collect_posts", elapsed)
+
+def crawl_and_store(exam, shared, conn, metrics, checkpoint):
+    """
+    Coleta os posts do exame em fluxo: a cada lote de --batch-size posts, baixa as árvores de
+    comentários necessárias e envia tudo à thread de escrita, liberando o lote em seguida.
+    Cada lote gravado é registrado no checkpoint da execução. Retorna os ids dos posts coletados.
+    """
+    args = shared.args
+    db_file = exam["db_file"]
+    search_query = exam["search_query"]
+
+    since_utc = None
+    if args.incremental:
+        since_utc, since_id = load_crawl_cursor(conn, exam["subreddit"], search_query)
+        logging.info(f"Modo incremental: cursor atual {since_id} ({since_utc}).")
+
+    logging.info("Coletando posts e salvando no banco de dados SQLite...")
+    listing = PostListing(
+        shared.reddit.subreddit(exam["subreddit"]), search_query, exam["start_date"], exam["end_date"],
+        limit=exam["limit"], post_filter=exam["post_filter"], since_utc=since_utc, metrics=metrics
+    )
+    writer = shared.writer.call(db_file, BulkWriter)
+    post_ids = []
+    failed_posts = []
+    for batch in batched(iter_listing(listing, shared.listing_lock, metrics), args.batch_size):
+        post_ids.extend(post.id for post in batch)
+        # Só posts novos ou com número de comentários alterado têm a árvore baixada novamente.
+        refresh = posts_needing_comments(conn, batch)
+        metrics.count("posts_refreshed", len(refresh))
+
+        def add_posts(_conn, batch=batch):
+            for post in batch:
+                writer.add_post(post)
+
+        # A coleta dos comentários e a gravação se sobrepõem; são medidas como uma única etapa.
+        with metrics.stage("save_posts_to_db"):
+            shared.writer.submit(db_file, add_posts)
+            logging.info(f"Baixando comentários de {len(refresh)} de {len(batch)} posts do lote...")
+            forests = fetch_comment_forests(
+                shared.reddit_factory, refresh, budget=shared.budget,
+                on_forest=lambda post, records: shared.writer.submit(
+                    db_file, lambda _conn: writer.add_forest(post, records)
+                ),
+                metrics=metrics, keep=False, top_comments=exam["top_comments"],
+                fetcher=shared.comment_fetcher
+            )
+        failed_posts.extend(post for post in refresh if post.id not in forests)
+
+        def checkpoint_batch(write_conn, batch=batch):
+            # A fila é FIFO: o lote e as suas árvores já passaram pelo BulkWriter.
+            writer.flush()
+            save_run_posts(write_conn, checkpoint.run_id, checkpoint.exam, [post.id for post in batch])
+
+        shared.writer.submit(db_file, checkpoint_batch)
+    with metrics.stage("save_posts_to_db"):
+        failures = shared.writer.call(db_file, lambda _conn: writer.close())
+    metrics.count("posts_collected", len(post_ids))
+    metrics.count("posts_written", writer.written["posts"])
+    metrics.count("comments_written", writer.written["comments"])
+    metrics.count("rows_rejected", len(failures))
+    logging.info(f"Coletados {len(post_ids)} posts úteis.")
+    metrics.count("comment_forests_failed", len(failed_posts))
+    cursor = crawl_cursor(listing.newest, failed_posts)
+    if failed_posts:
+        logging.warning(
+            f"{len(failed_posts)} posts ficaram sem comentários; o cursor fica antes do post "
+            f"{cursor[1]} para que sejam baixados na próxima coleta."
+        )
+    if cursor is not None:
+        shared.writer.call(db_file, lambda write_conn: save_crawl_cursor(
+            write_conn, exam["subreddit"], search_query, *cursor
+        ))
+    logging.info("Dados salvos no banco de dados SQLite.")
+    return post_ids
+
+def iter_stored_documents(exam, conn, skip_redundant=False, post_ids=None):
+    """
+    Gera os documentos a partir do banco, com os filtros do exame aplicados em SQL
+    (palavras-chave via FTS5, intervalo de datas, tamanho mínimo do corpo e limite).
+    Com post_ids, só os posts informados (os da coleta atual) são considerados.
+    """
+    match = keywords_to_match(exam["keywords"]) if exam["keywords"] else None
+    return iter_post_documents(
+        conn, match=match, start_date=exam["start_date"], end_date=exam["end_date"],
+        min_length=exam["min_length"], limit=exam["limit"], include_comments=exam["include_comments"],
+        skip_redundant=skip_redundant, post_ids=post_ids, top_comments=exam["top_comments"]
+    )
+
+def deduplicate(exam, shared, conn, metrics, post_ids=None):
+    """
+    Calcula as assinaturas das linhas novas (pela thread de escrita) e registra quanto a
+    deduplicação retira do corpus do exame, com o mesmo recorte dos documentos (limit,
+    top_comments e, com post_ids, só os posts da coleta atual).
+    """
+    with metrics.stage("dedup"):
+        shared.writer.call(exam["db_file"], update_signatures)
+        match = keywords_to_match(exam["keywords"]) if exam["keywords"] else None
+        report = redundancy_report(
+            conn, match, exam["start_date"], exam["end_date"], exam["min_length"], exam["include_comments"],
+            limit=exam["limit"], top_comments=exam["top_comments"], post_ids=post_ids
+        )
+    for name, value in report.items():
+        metrics.count(f"dedup_{name}", value)
+    logging.info(
+        f"Deduplicação: {report['posts_removed']} posts e {report['comments_removed']} comentários "
+        f"redundantes removidos ({report['bytes_saved']} bytes, ~{report['tokens_saved']} tokens "
+        f"economizados; restam ~{report['tokens_after']} tokens)."
+    )
+
+def select_exam_documents(exam, conn, token_budget, skip_redundant=False):
+    """
+    Ranqueia os posts armazenados que passam pelos filtros do exame e empacota os de maior valor
+    em token_budget. rank_keywords (lista ou {palavra: peso}) define a relevância; sem ele,
+    são usadas as palavras-chave do filtro. As respostas de cada post passam pelo mesmo corte
+    (top_comments) da montagem sem orçamento.
+    """
+    match = keywords_to_match(exam["keywords"]) if exam["keywords"] else None
+    return select_ranked_documents(
+        conn, token_budget, keywords=exam["rank_keywords"] or exam["keywords"],
+        start_date=exam["start_date"], end_date=exam["end_date"], min_length=exam["min_length"],
+        limit=exam["limit"], match=match, include_comments=exam["include_comments"],
+        skip_redundant=skip_redundant, top_comments=exam["top_comments"]
+    )
+
+def analyze_exam(exam, documents, shared, on_text=None, cache=None, metrics=None, checkpoint=None):
+    """
+    Analisa os documentos do exame em map-reduce no Ollama, usando o pool compartilhado e as
+    opções de geração do exame.
+    """
+    return map_reduce_generate(
+        documents, exam["extraction_prompt"], exam["report_prompt"], model=exam["model"],
+        num_ctx=exam_num_ctx(exam, shared.args), num_predict=exam["num_predict"],
+        max_workers=shared.llm_workers, cache=cache, on_text=on_text, executor=shared.llm_executor,
+        metrics=metrics, checkpoint=checkpoint, pool=shared.ollama, keep_alive=exam["keep_alive"],
+        extra_options=exam["options"]
+    )
+
+def exam_num_ctx(exam, args):
+    # --num-ctx, se informado, vale para todos os exames.
+    return args.num_ctx or exam["num_ctx"]
+
+def partial_output_file(exam):
+    return f"{exam['output_file']}.parcial"
+
+def run_mode(args):
+    return "offline" if args.offline else "incremental" if args.incremental else "completo"
+
+def resolve_run_id(exam, shared):
+    """
+    Escolhe o run_id do exame: o informado em --resume, a última execução interrompida do exame
+    (--resume sem valor) ou, sem --resume, o id novo desta execução.
+    """
+    resume = shared.args.resume
+    if resume and resume != "latest":
+        return resume
+    if resume:
+        run_id = latest_unfinished_run(exam["db_file"], exam["name"])
+        if run_id is not None:
+            return run_id
+        logging.info(f"Nenhuma execução interrompida para retomar; iniciando a execução {shared.run_id}.")
+    return shared.run_id
+
+def run_exam(exam, shared):
+    """
+    Executa um exame medindo cada etapa; as métricas (e o perfil, com --profile) são gravadas em
+    --metrics-dir ao final, mesmo se a execução falhar.
+    """
+    args = shared.args
+    threading.current_thread().name = exam["name"]
+    metrics = RunMetrics(exam["name"])
+    # O banco é criado/migrado pela thread de escrita antes de receber os checkpoints.
+    shared.writer.call(exam["db_file"], lambda _conn: None)
+    checkpoint = RunCheckpoint(exam["db_file"], resolve_run_id(exam, shared), exam["name"])
+    status = "erro"
+    try:
+        if args.profile:
+            with profiled(metrics, args.metrics_dir):
+                run_exam_stages(exam, shared, metrics, checkpoint)
+        else:
+            run_exam_stages(exam, shared, metrics, checkpoint)
+        status = "ok"
+    finally:
+        checkpoint.close()
+        metrics.write(args.metrics_dir, extra={
+            "status": status,
+            "run_id": checkpoint.run_id,
+            "mode": run_mode(args),
+            "options": {"workers": args.workers, "llm_workers": shared.llm_workers,
+                        "num_ctx": exam_num_ctx(exam, args), "ollama_hosts": len(shared.ollama.hosts),
+                        "model": exam["model"], "cache": not args.no_cache, "stream": args.stream},
+        })
+
+def run_exam_stages(exam, shared, metrics, checkpoint):
+    """
+    Executa o pipeline completo de um exame: coleta (ou leitura offline), análise, tradução e saída.
+    Etapas já concluídas na execução do checkpoint (ao retomar com --resume) são puladas.
+    """
+    args = shared.args
+    db_file = exam["db_file"]
+    options = {"mode": run_mode(args), "token_budget": args.token_budget, "dedup": not args.no_dedup,
+               "num_ctx": exam_num_ctx(exam, args)}
+    if checkpoint.start(options, resume=bool(args.resume)):
+        logging.info(f"Retomando a execução {checkpoint.run_id}.")
+
+    analysis = checkpoint.stage("analysis")
+    if analysis is None:
+        # Esta conexão é usada para leituras; as gravações passam pela thread de escrita.
+        conn = setup_database(db_file)
+        try:
+            analysis = collect_and_analyze(exam, shared, conn, metrics, checkpoint)
+        finally:
+            conn.close()
+        if analysis is None:
+            checkpoint.finish()
+            return
+        if analysis == GENERATION_ERROR:
+            # A execução fica em andamento (com os lotes já extraídos) para ser retomada com
+            # --resume, e a análise anterior não é sobrescrita.
+            raise RuntimeError(
+                f"O Ollama não gerou a análise; retome com --resume {checkpoint.run_id}."
+            )
+        checkpoint.complete("analysis", analysis)
+    else:
+        logging.info("Análise já concluída nesta execução; pulando coleta e análise.")
+
+    # Remove possíveis blocos <think>...</think> da resposta
+    with metrics.stage("remove_think_blocks"):
+        analysis = remove_think_blocks(analysis)
+
+    # Tradução final para PT (caso o LLM responda em inglês ou mesclado)
+    translated = checkpoint.stage("translation")
+    complete = True
+    if translated is None:
+        translation_stats = {}
+        with metrics.stage("translate_to_portuguese"):
+            translated = translate_to_portuguese(analysis, db_file=db_file, stats=translation_stats)
+        complete = not translation_stats["failed"]
+        if complete:
+            checkpoint.complete("translation", translated)
+    analysis = translated
+    metrics.count("report_chars", len(analysis))
+
+    # Salva os resultados da análise (traduzidos), substituindo a versão gravada em streaming
+    ai_output_file = exam["output_file"]
+    with open(ai_output_file, "w", encoding="utf-8") as f:
+        f.write(analysis)
+    if os.path.exists(partial_output_file(exam)):
+        os.remove(partial_output_file(exam))
+    if not complete:
+        # Segmentos não traduzidos ficaram no idioma original: a execução continua em andamento
+        # para que --resume refaça só a tradução.
+        logging.warning(
+            f"Tradução incompleta ({translation_stats['failed']} segmentos no idioma original); "
+            f"retome com --resume {checkpoint.run_id}."
+        )
+        return
+    checkpoint.finish()
+
+    logging.info(f"Análise de IA concluída. Confira '{ai_output_file}' para os resultados.")
+
+def collect_and_analyze(exam, shared, conn, metrics, checkpoint):
+    """
+    Coleta (fora do modo offline), deduplica e analisa os posts do exame. Retorna a análise, ou
+    None se a coleta incremental não encontrou posts novos.
+    """
+    args = shared.args
+    db_file = exam["db_file"]
+    if args.offline:
+        logging.info("Modo offline: analisando os posts já armazenados, sem chamadas ao Reddit.")
+    elif checkpoint.stage("crawl") is not None:
+        post_ids = checkpoint.post_ids()
+        logging.info(f"Coleta já concluída nesta execução ({len(post_ids)} posts); pulando.")
+    else:
+        post_ids = crawl_and_store(exam, shared, conn, metrics, checkpoint)
+        checkpoint.complete("crawl")
+    if not args.offline and args.incremental and not post_ids:
+        logging.info("Nenhum post novo desde a última coleta; análise anterior mantida.")
+        return None
+
+    token_budget = args.token_budget or exam["token_budget"]
+    # No modo incremental só o delta foi coletado; a análise cobre todo o corpus armazenado.
+    # Fora dele (e sem orçamento), só os posts da coleta atual.
+    document_post_ids = None if token_budget or args.offline or args.incremental else post_ids
+
+    skip_redundant = not args.no_dedup
+    if skip_redundant and checkpoint.stage("dedup") is None:
+        deduplicate(exam, shared, conn, metrics, document_post_ids)
+        checkpoint.complete("dedup")
+
+    if token_budget:
+        # Só os posts e comentários de maior valor que cabem no orçamento vão para o modelo.
+        with metrics.stage("prompts"):
+            documents = select_exam_documents(exam, conn, token_budget, skip_redundant)
+    else:
+        # Os documentos são lidos do banco sob demanda, um post por vez, durante a análise.
+        documents = iter_stored_documents(exam, conn, skip_redundant, post_ids=document_post_ids)
+
+    logging.info("Analisando posts com IA (Ollama)...")
+    cache = None if args.no_cache else GenerationCache(db_file)
+    # O streaming vai para um arquivo .parcial: a análise anterior só é substituída no final.
+    stream_file = open(partial_output_file(exam), "w", encoding="utf-8") if args.stream else None
+
+    def write_progress(text):
+        # Em streaming, o texto (já sem <think>) vai para o arquivo assim que chega.
+        stream_file.write(text)
+        stream_file.flush()
+
+    try:
+        with metrics.stage("analyze_success"):
+            return analyze_exam(
+                exam, documents, shared, on_text=write_progress if args.stream else None, cache=cache,
+                metrics=metrics, checkpoint=checkpoint
+            )
+    finally:
+        if stream_file is not None:
+            stream_file.close()
+        if cache is not None:
+            cache.close()
+
+def run_exams(exams, args):
+    """
+    Executa todos os exames em paralelo, compartilhando os recursos da execução.
+    Retorna os nomes dos exames que falharam.
+    """
+    shared = SharedResources(args, offline=args.offline)
+    if args.preload:
+        shared.ollama.preload({exam["model"] for exam in exams})
+    failed = []
+    try:
+        with ThreadPoolExecutor(max_workers=len(exams)) as executor:
+            futures = {executor.submit(run_exam, exam, shared): exam["name"] for exam in exams}
+        for future, name in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                logging.error(f"Erro ao processar o exame {name}: {e}")
+                failed.append(name)
+    finally:
+        shared.close()
+    return failed
+
+def build_arg_parser(description):
+    """
+    Cria o parser com as opções comuns a todos os scripts de exame.
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Coleta apenas os posts mais novos que o cursor salvo no banco na última execução."
+    )
+    parser.add_argument(
+        "--workers", type=int, default=8,
+        help="Número de threads que baixam árvores de comentários em paralelo (somando os exames)."
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=100,
+        help="Posts coletados, gravados e liberados por vez (limita o uso de memória da coleta)."
+    )
+    parser.add_argument(
+        "--offline", action="store_true",
+        help="Não acessa o Reddit: analisa os posts já armazenados no banco SQLite."
+    )
+    parser.add_argument(
+        "--num-ctx", type=int,
+        help="Janela de contexto (em tokens) usada para dividir os posts em lotes para o modelo "
+             "(padrão: a do exame, 8192)."
+    )
+    parser.add_argument(
+        "--llm-workers", type=int,
+        help="Número de lotes analisados simultaneamente pelo Ollama, somando todos os exames "
+             "(padrão: a capacidade somada de --ollama-hosts)."
+    )
+    parser.add_argument(
+        "--ollama-hosts", nargs="+", metavar="URL[=N]",
+        help="Servidores Ollama, cada um com até N chamadas simultâneas (padrão: OLLAMA_HOST ou "
+             "localhost, com 2). Ex.: http://gpu1:11434=4 http://gpu2:11434=2"
+    )
+    parser.add_argument(
+        "--keep-alive", type=parse_keep_alive, default=DEFAULT_KEEP_ALIVE,
+        help="Tempo que o modelo fica carregado no Ollama após a última chamada (ex.: 30m, 1h, -1)."
+    )
+    parser.add_argument(
+        "--preload", action="store_true",
+        help="Carrega os modelos dos exames em todos os servidores Ollama enquanto a coleta acontece."
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Ignora o cache de respostas do LLM e chama o modelo para todos os lotes."
+    )
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="Gera o relatório em streaming, gravando o texto no arquivo de saída à medida que chega."
+    )
+    parser.add_argument(
+        "--token-budget", type=int,
+        help="Envia ao modelo só os posts e comentários mais relevantes que cabem neste total de tokens."
+    )
+    parser.add_argument(
+        "--no-dedup", action="store_true",
+        help="Não remove posts quase duplicados nem respostas sem conteúdo antes da análise."
+    )
+    parser.add_argument(
+        "--run-id",
+        help="Id da execução sob o qual os checkpoints são gravados (padrão: data e hora UTC)."
+    )
+    parser.add_argument(
+        "--resume", nargs="?", const="latest", metavar="RUN_ID",
+        help="Retoma uma execução interrompida (sem valor, a mais recente de cada exame), "
+             "pulando as etapas e os lotes já concluídos."
+    )
+    parser.add_argument(
+        "--metrics-dir", default="metrics",
+        help="Diretório onde cada execução grava suas métricas (<exame>_<data>.json)."
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="Perfila os exames com cProfile (um por vez) e grava <exame>_<data>.prof em --metrics-dir."
+    )
+    return parser
+
+def run_single_exam(exam, description):
+    """
+    Ponto de entrada dos scripts de um único exame (oscpInsights.py, cisspInsights.py).
+    """
+    args = build_arg_parser(description).parse_args()
+    setup_logging()
+    if run_exams([exam_from_config(exam)], args):
+        raise SystemExit(1)
+
+def main():
+    parser = build_arg_parser("Coleta e analisa histórias de sucesso de vários exames em paralelo.")
+    parser.add_argument(
+        "--exams", nargs="+",
+        help="Exames a executar (padrão: todos os configurados)."
+    )
+    parser.add_argument(
+        "--config",
+        help="Arquivo JSON com exames adicionais (ou que substituem os embutidos)."
+    )
+    args = parser.parse_args()
+    exams = load_exams(args.exams, args.config)
+    setup_logging(multi_exam=len(exams) > 1)
+    logging.info(f"Executando {len(exams)} exames: {', '.join(exam['name'] for exam in exams)}.")
+    if run_exams(exams, args):
+        raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,521 @@
+import json
+import sqlite3
+import logging
+import time
+
+def setup_database(db_file):
+    """
+    Configura o banco de dados SQLite e cria as tabelas necessárias para posts, comentários
+    e o cursor de coleta incremental. Bancos criados por versões antigas são migrados no lugar.
+    """
+    conn = sqlite3.connect(db_file)
+    cur = conn.cursor()
+    # WAL permite leituras durante a escrita; synchronous=NORMAL é seguro em WAL e evita um
+    # fsync por commit. cache_size negativo é em KiB (64 MiB).
+    cur.execute("PRAGMA journal_mode = WAL")
+    cur.execute("PRAGMA synchronous = NORMAL")
+    cur.execute("PRAGMA cache_size = -65536")
+    cur.execute("PRAGMA temp_store = MEMORY")
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS posts (
+            id TEXT PRIMARY KEY,
+            title TEXT,
+            selftext TEXT,
+            url TEXT,
+            created_utc REAL
+        );
+    ''')
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS comments (
+            id TEXT PRIMARY KEY,
+            post_id TEXT,
+            comment_body TEXT,
+            created_utc REAL,
+            FOREIGN KEY (post_id) REFERENCES posts (id)
+        );
+    ''')
+    # Marca d'água por subreddit+query: o post mais novo já visto na listagem sort="new".
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS crawl_state (
+            subreddit TEXT,
+            search_query TEXT,
+            newest_utc REAL,
+            newest_id TEXT,
+            updated_at REAL,
+            PRIMARY KEY (subreddit, search_query)
+        );
+    ''')
+    # num_comments guarda quantos comentários o post tinha na última vez em que a árvore foi baixada.
+    ensure_column(cur, "posts", "num_comments", "INTEGER")
+    # Pontuação (upvotes - downvotes) no Reddit, usada no ranking de relevância.
+    ensure_column(cur, "posts", "score", "INTEGER")
+    ensure_column(cur, "comments", "score", "INTEGER")
+    # Posição do comentário na árvore (ver redditCrawler.CommentRecord) e flair do autor.
+    ensure_column(cur, "comments", "parent_id", "TEXT")
+    ensure_column(cur, "comments", "depth", "INTEGER")
+    ensure_column(cur, "comments", "author_flair", "TEXT")
+    setup_dedup_columns(cur)
+    # Índices secundários para filtros por post e por data.
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_comments_post_id ON comments (post_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_comments_created_utc ON comments (created_utc)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_posts_created_utc ON posts (created_utc)")
+    # Respostas de um post já na ordem de pontuação (seleção das N melhores sem ordenar).
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_comments_post_score ON comments (post_id, score DESC)")
+    setup_fulltext_index(cur)
+    conn.commit()
+    return conn
+
+def setup_fulltext_index(cur):
+    """
+    Cria os índices FTS5 sobre posts (title, selftext) e comments (comment_body), mantidos em
+    sincronia por triggers. Em bancos antigos, o índice é populado a partir das tabelas existentes.
+    Os triggers de atualização só reindexam quando o texto muda (o upsert também reatribui o
+    texto quando só o score mudou) e são recriados para migrar bancos com a versão anterior.
+    """
+    existing = {row[0] for row in cur.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    # tokenize porter: "study" também encontra "studying"/"studied", como no filtro por substring.
+    cur.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+            title, selftext, content='posts', content_rowid='rowid', tokenize='porter unicode61'
+        );
+    ''')
+    cur.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS comments_fts USING fts5(
+            comment_body, content='comments', content_rowid='rowid', tokenize='porter unicode61'
+        );
+    ''')
+    cur.executescript('''
+        CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts BEGIN
+            INSERT INTO posts_fts (rowid, title, selftext) VALUES (new.rowid, new.title, new.selftext);
+        END;
+        CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts BEGIN
+            INSERT INTO posts_fts (posts_fts, rowid, title, selftext)
+            VALUES ('delete', old.rowid, old.title, old.selftext);
+        END;
+        DROP TRIGGER IF EXISTS posts_fts_update;
+        CREATE TRIGGER posts_fts_update AFTER UPDATE OF title, selftext ON posts
+        WHEN old.title IS NOT new.title OR old.selftext IS NOT new.selftext BEGIN
+            INSERT INTO posts_fts (posts_fts, rowid, title, selftext)
+            VALUES ('delete', old.rowid, old.title, old.selftext);
+            INSERT INTO posts_fts (rowid, title, selftext) VALUES (new.rowid, new.title, new.selftext);
+        END;
+        CREATE TRIGGER IF NOT EXISTS comments_fts_insert AFTER INSERT ON comments BEGIN
+            INSERT INTO comments_fts (rowid, comment_body) VALUES (new.rowid, new.comment_body);
+        END;
+        CREATE TRIGGER IF NOT EXISTS comments_fts_delete AFTER DELETE ON comments BEGIN
+            INSERT INTO comments_fts (comments_fts, rowid, comment_body)
+            VALUES ('delete', old.rowid, old.comment_body);
+        END;
+        DROP TRIGGER IF EXISTS comments_fts_update;
+        CREATE TRIGGER comments_fts_update AFTER UPDATE OF comment_body ON comments
+        WHEN old.comment_body IS NOT new.comment_body BEGIN
+            INSERT INTO comments_fts (comments_fts, rowid, comment_body)
+            VALUES ('delete', old.rowid, old.comment_body);
+            INSERT INTO comments_fts (rowid, comment_body) VALUES (new.rowid, new.comment_body);
+        END;
+    ''')
+    if "posts_fts" not in existing:
+        cur.execute("INSERT INTO posts_fts (posts_fts) VALUES ('rebuild')")
+    if "comments_fts" not in existing:
+        cur.execute("INSERT INTO comments_fts (comments_fts) VALUES ('rebuild')")
+
+def setup_dedup_columns(cur):
+    """
+    Cria as colunas da deduplicação (ver nearDuplicates.py): assinatura SimHash, id do item do
+    qual a linha é quase-duplicata e, nos comentários, a marca de resposta sem conteúdo.
+    Quando o texto muda, um trigger apaga a assinatura para que ela seja recalculada.
+    """
+    for table in ("posts", "comments"):
+        ensure_column(cur, table, "simhash", "INTEGER")
+        ensure_column(cur, table, "duplicate_of", "TEXT")
+    ensure_column(cur, "comments", "low_content", "INTEGER")
+    # Índices parciais: só as linhas ainda sem assinatura (as novas) são visitadas.
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_posts_pending_simhash ON posts (created_utc) WHERE simhash IS NULL")
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_comments_pending_simhash ON comments (created_utc) WHERE simhash IS NULL"
+    )
+    # UPDATE OF dispara sempre que o upsert atribui a coluna, mesmo com o mesmo valor (ex.: só o
+    # score mudou); o WHEN limita o reset às mudanças reais de texto. Os triggers são recriados
+    # para que bancos com a versão sem WHEN sejam migrados.
+    cur.executescript('''
+        DROP TRIGGER IF EXISTS posts_simhash_reset;
+        CREATE TRIGGER posts_simhash_reset AFTER UPDATE OF title, selftext ON posts
+        WHEN old.title IS NOT new.title OR old.selftext IS NOT new.selftext BEGIN
+            UPDATE posts SET simhash = NULL, duplicate_of = NULL WHERE rowid = new.rowid;
+        END;
+        DROP TRIGGER IF EXISTS comments_simhash_reset;
+        CREATE TRIGGER comments_simhash_reset AFTER UPDATE OF comment_body ON comments
+        WHEN old.comment_body IS NOT new.comment_body BEGIN
+            UPDATE comments SET simhash = NULL, duplicate_of = NULL, low_content = NULL
+            WHERE rowid = new.rowid;
+        END;
+    ''')
+
+def ensure_column(cur, table, column, declaration):
+    """
+    Adiciona a coluna à tabela caso ela ainda não exista (migração de bancos antigos).
+    """
+    columns = {row[1] for row in cur.execute(f"PRAGMA table_info({table})")}
+    if column not in columns:
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+
+def load_crawl_cursor(conn, subreddit_name, search_query):
+    """
+    Retorna (newest_utc, newest_id) da última coleta para o subreddit+query, ou (None, None).
+    """
+    row = conn.execute('''
+        SELECT newest_utc, newest_id FROM crawl_state
+        WHERE subreddit = ? AND search_query = ?
+    ''', (subreddit_name.lower(), search_query)).fetchone()
+    return row if row else (None, None)
+
+def save_crawl_cursor(conn, subreddit_name, search_query, newest_utc, newest_id, rewind=False):
+    """
+    Registra o post mais novo visto na listagem. O cursor nunca retrocede, exceto com rewind
+    (posts já passados cuja árvore de comentários falhou e precisa ser baixada de novo).
+    """
+    guard = "" if rewind else "WHERE excluded.newest_utc > crawl_state.newest_utc OR crawl_state.newest_utc IS NULL"
+    conn.execute(f'''
+        INSERT INTO crawl_state (subreddit, search_query, newest_utc, newest_id, updated_at)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (subreddit, search_query) DO UPDATE SET
+            newest_utc = excluded.newest_utc,
+            newest_id = excluded.newest_id,
+            updated_at = excluded.updated_at
+        {guard}
+    ''', (subreddit_name.lower(), search_query, newest_utc, newest_id, time.time()))
+    conn.commit()
+
+def stored_comment_counts(conn, post_ids):
+    """
+    Retorna {post_id: num_comments} para os posts já armazenados.
+    """
+    counts = {}
+    post_ids = list(post_ids)
+    # Consulta em lotes para não estourar o limite de parâmetros do SQLite.
+    for i in range(0, len(post_ids), 500):
+        batch = post_ids[i:i + 500]
+        placeholders = ",".join("?" * len(batch))
+        for post_id, num_comments in conn.execute(
+            f"SELECT id, num_comments FROM posts WHERE id IN ({placeholders})", batch
+        ):
+            counts[post_id] = num_comments
+    return counts
+
+def posts_needing_comments(conn, posts):
+    """
+    Seleciona os posts cuja árvore de comentários precisa ser baixada:
+    posts novos ou cujo num_comments mudou desde a última coleta.
+    """
+    known = stored_comment_counts(conn, [post.id for post in posts])
+    return [post for post in posts if post.id not in known or known[post.id] != post.num_comments]
+
+class BulkWriter:
+    """
+    Escritor em lote para posts e comentários.
+    Acumula linhas e as grava com executemany em uma transação por lote; linhas existentes só
+    são atualizadas (upsert) quando o conteúdo mudou. Linhas inválidas são rejeitadas antes do
+    lote e registradas em failures, sem recorrer à gravação linha a linha.
+    """
+
+    def __init__(self, conn, batch_size=1000):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.posts = []
+        self.comments = []
+        self.comment_counts = []
+        self.failures = []
+        self.written = {"posts": 0, "comments": 0}
+
+    def reject(self, kind, row_id, reason):
+        """
+        Registra uma linha rejeitada.
+        """
+        self.failures.append((kind, row_id, reason))
+        logging.error(f"Erro ao salvar o {kind} {row_id}: {reason}")
+
+    def add_post(self, post):
+        """
+        Enfileira um post (objeto com id, title, selftext, url, created_utc e, opcionalmente, score).
+        """
+        if not post.id or post.created_utc is None:
+            self.reject("post", post.id, "id ou created_utc ausente")
+            return
+        self.posts.append(
+            (post.id, post.title, post.selftext or "", post.url, post.created_utc, getattr(post, "score", None))
+        )
+        self.maybe_flush()
+
+    def add_forest(self, post, comments):
+        """
+        Enfileira a árvore de comentários (CommentRecord) já baixada de um post. O num_comments
+        do post só é gravado junto com os comentários, para que falhas sejam refeitas.
+        """
+        for comment in comments:
+            if not comment.id or not isinstance(comment.body, str):
+                self.reject("comentário", comment.id, "id ausente ou corpo inválido")
+                continue
+            self.comments.append((
+                comment.id, comment.post_id, comment.body, comment.created_utc, comment.score,
+                comment.parent_id, comment.depth, comment.author_flair
+            ))
+        self.comment_counts.append((post.num_comments, post.id))
+        self.maybe_flush()
+
+    def maybe_flush(self):
+        if len(self.posts) + len(self.comments) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Grava as linhas pendentes em uma única transação.
+        """
+        if not (self.posts or self.comments or self.comment_counts):
+            return
+        with self.conn:
+            self.conn.executemany('''
+                INSERT INTO posts (id, title, selftext, url, created_utc, score)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET
+                    title = excluded.title,
+                    selftext = excluded.selftext,
+                    url = excluded.url,
+                    score = excluded.score
+                WHERE posts.title IS NOT excluded.title
+                    OR posts.selftext IS NOT excluded.selftext
+                    OR posts.url IS NOT excluded.url
+                    OR posts.score IS NOT excluded.score
+            ''', self.posts)
+            self.conn.executemany('''
+                INSERT INTO comments (id, post_id, comment_body, created_utc, score, parent_id, depth, author_flair)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET
+                    comment_body = excluded.comment_body,
+                    score = excluded.score,
+                    parent_id = excluded.parent_id,
+                    depth = excluded.depth,
+                    author_flair = excluded.author_flair
+                WHERE comments.comment_body IS NOT excluded.comment_body
+                    OR comments.score IS NOT excluded.score
+                    OR comments.parent_id IS NOT excluded.parent_id
+                    OR comments.depth IS NOT excluded.depth
+                    OR comments.author_flair IS NOT excluded.author_flair
+            ''', self.comments)
+            self.conn.executemany("UPDATE posts SET num_comments = ? WHERE id = ?", self.comment_counts)
+        self.written["posts"] += len(self.posts)
+        self.written["comments"] += len(self.comments)
+        self.posts = []
+        self.comments = []
+        self.comment_counts = []
+
+    def close(self):
+        """
+        Grava o que restou e registra o resumo da ingestão.
+        """
+        self.flush()
+        logging.info(
+            f"Gravados {self.written['posts']} posts e {self.written['comments']} comentários "
+            f"({len(self.failures)} linhas rejeitadas)."
+        )
+        return self.failures
+
+def save_posts_to_db(conn, posts, forests):
+    """
+    Salva os posts e as árvores de comentários já baixadas no banco de dados SQLite.
+    - forests é o resultado de fetch_comment_forests ({post_id: [CommentRecord, ...]});
+      posts sem entrada em forests têm apenas a linha do post atualizada.
+    Retorna a lista de linhas rejeitadas.
+    """
+    writer = BulkWriter(conn)
+    for post in posts:
+        writer.add_post(post)
+        if post.id in forests:
+            writer.add_forest(post, forests[post.id])
+    return writer.close()
+
+# Condição SQL dos comentários que restam após a deduplicação.
+NON_REDUNDANT_COMMENT = "duplicate_of IS NULL AND NOT COALESCE(low_content, 0)"
+
+def load_comment_bodies(conn, post_id, skip_redundant=False, top_comments=None):
+    """
+    Retorna os textos dos comentários armazenados para o post.
+    Com skip_redundant, quase-duplicatas e respostas sem conteúdo são omitidas.
+    Com top_comments, só as N respostas diretas ao post de maior pontuação, da melhor para a pior,
+    lidas pelo índice (post_id, score). Posts gravados antes de a profundidade ser registrada
+    (sem depth em nenhum comentário) não têm como separar as respostas diretas nem ordená-las
+    com segurança, e mantêm todos os comentários.
+    """
+    sql = "SELECT comment_body FROM comments WHERE post_id = ?"
+    params = [post_id]
+    if skip_redundant:
+        sql += f" AND {NON_REDUNDANT_COMMENT}"
+    if top_comments is not None and has_comment_depth(conn, post_id):
+        sql += " AND depth = 0 ORDER BY score DESC, rowid LIMIT ?"
+        params.append(top_comments)
+    return [row[0] for row in conn.execute(sql, params)]
+
+def has_comment_depth(conn, post_id):
+    """
+    Indica se os comentários do post foram gravados com a profundidade (depth) na árvore.
+    """
+    return conn.execute(
+        "SELECT EXISTS (SELECT 1 FROM comments WHERE post_id = ? AND depth IS NOT NULL)", (post_id,)
+    ).fetchone()[0] == 1
+
+def keywords_to_match(keywords):
+    """
+    Converte uma lista de palavras-chave/frases em uma expressão MATCH do FTS5 (OR entre elas).
+    """
+    return " OR ".join('"{}"'.format(keyword.replace('"', '""')) for keyword in keywords)
+
+def post_filter_sql(match=None, start_date=None, end_date=None, min_length=None, skip_redundant=False,
+                    post_ids=None):
+    """
+    Monta a cláusula FROM/WHERE (e parâmetros) dos filtros de posts: texto (FTS5), datas,
+    tamanho mínimo do selftext, com skip_redundant, exclusão de quase-duplicatas e, com post_ids,
+    restrição a esses posts. Os posts ficam com o alias p.
+    """
+    clauses = []
+    params = []
+    source = "posts p"
+    if match:
+        source = "posts_fts JOIN posts p ON p.rowid = posts_fts.rowid"
+        clauses.append("posts_fts MATCH ?")
+        params.append(match)
+    if start_date is not None:
+        clauses.append("p.created_utc >= ?")
+        params.append(start_date)
+    if end_date is not None:
+        clauses.append("p.created_utc <= ?")
+        params.append(end_date)
+    if min_length is not None:
+        clauses.append("length(p.selftext) > ?")
+        params.append(min_length)
+    if skip_redundant:
+        clauses.append("p.duplicate_of IS NULL")
+    if post_ids is not None:
+        # Um único parâmetro (lista JSON), sem esbarrar no limite de variáveis do SQLite.
+        clauses.append("p.id IN (SELECT value FROM json_each(?))")
+        params.append(json.dumps(list(post_ids)))
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return f"FROM {source} {where}", params
+
+def search_posts(conn, match=None, start_date=None, end_date=None, min_length=None, limit=None):
+    """
+    Busca posts com filtros indexados, em vez de varrer objetos em Python.
+    - match é uma expressão FTS5 (ex.: keywords_to_match([...]) ou '"active directory" AND htb').
+    - start_date/end_date são timestamps UTC; min_length é o tamanho mínimo do selftext.
+    Retorna um cursor de (id, title, selftext, url, created_utc), ordenado por relevância
+    quando há match e do mais novo para o mais antigo caso contrário.
+    """
+    filters, params = post_filter_sql(match, start_date, end_date, min_length)
+    order = "ORDER BY bm25(posts_fts)" if match else "ORDER BY p.created_utc DESC"
+    sql = f"SELECT p.id, p.title, p.selftext, p.url, p.created_utc {filters} {order}"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return conn.execute(sql, params)
+
+def format_post_document(title, selftext, url, comment_bodies=()):
+    """
+    Formata um post (e, opcionalmente, seus comentários) como um documento para o LLM.
+    O formato é o mesmo na coleta online e na leitura do banco, para que o cache seja reaproveitado.
+    """
+    post_texts = [f"Title: {title}\nBody: {selftext}\nURL: {url}\n"]
+    for comment_body in comment_bodies:
+        post_texts.append(f"Reply: {comment_body}\n\n")
+    return "\n".join(post_texts)
+
+def iter_post_documents(conn, match=None, start_date=None, end_date=None, min_length=None,
+                        limit=None, include_comments=False, skip_redundant=False, post_ids=None,
+                        top_comments=None):
+    """
+    Gera os documentos de análise diretamente do banco, sem chamadas ao Reddit.
+    Os filtros são aplicados em SQL (ver post_filter_sql); limit mantém os posts mais novos.
+    Os posts são lidos por cursor e entregues do mais antigo para o mais novo, um por vez,
+    com os comentários buscados pelo índice de post_id.
+    Com skip_redundant, quase-duplicatas e respostas sem conteúdo ficam de fora; com top_comments,
+    só as N respostas diretas de maior pontuação de cada post entram (ver load_comment_bodies).
+    """
+    filters, params = post_filter_sql(match, start_date, end_date, min_length, skip_redundant, post_ids)
+    # Só rowid e data passam pela ordenação; o texto de cada post é lido quando ele é entregue.
+    sql = f"SELECT p.rowid AS post_rowid, p.created_utc {filters} ORDER BY p.created_utc DESC"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    for (rowid,) in conn.execute(f"SELECT post_rowid FROM ({sql}) ORDER BY created_utc", params):
+        post_id, title, selftext, url = conn.execute(
+            "SELECT id, title, selftext, url FROM posts WHERE rowid = ?", (rowid,)
+        ).fetchone()
+        comment_bodies = ()
+        if include_comments:
+            comment_bodies = load_comment_bodies(conn, post_id, skip_redundant, top_comments)
+        yield format_post_document(title, selftext, url, comment_bodies)
+
+def search_comments(conn, match=None, post_id=None, start_date=None, end_date=None, limit=None):
+    """
+    Busca comentários por texto (FTS5), post e intervalo de datas.
+    Retorna um cursor de (id, post_id, comment_body, created_utc).
+    """
+    clauses = []
+    params = []
+    source = "comments c"
+    if match:
+        source = "comments_fts JOIN comments c ON c.rowid = comments_fts.rowid"
+        clauses.append("comments_fts MATCH ?")
+        params.append(match)
+    if post_id is not None:
+        clauses.append("c.post_id = ?")
+        params.append(post_id)
+    if start_date is not None:
+        clauses.append("c.created_utc >= ?")
+        params.append(start_date)
+    if end_date is not None:
+        clauses.append("c.created_utc <= ?")
+        params.append(end_date)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    sql = f"SELECT c.id, c.post_id, c.comment_body, c.created_utc FROM {source} {where} ORDER BY c.created_utc"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return conn.execute(sql, params)
+
+def main():
+    """
+    CLI de consulta: busca posts (ou comentários) em um banco *_posts.db por texto e data.
+    Ex.: python3 insightsStore.py oscp_posts.db '"privilege escalation" OR htb' --since 2023-01-01
+    """
+    import argparse
+    from datetime import datetime, timezone
+
+    def to_timestamp(value):
+        return datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp()
+
+    parser = argparse.ArgumentParser(description="Consulta posts e comentários armazenados.")
+    parser.add_argument("db_file", help="Banco SQLite (ex.: oscp_posts.db).")
+    parser.add_argument("match", nargs="?", help="Expressão de busca FTS5.")
+    parser.add_argument("--since", type=to_timestamp, help="Data inicial (AAAA-MM-DD).")
+    parser.add_argument("--until", type=to_timestamp, help="Data final (AAAA-MM-DD).")
+    parser.add_argument("--min-length", type=int, help="Tamanho mínimo do corpo do post.")
+    parser.add_argument("--comments", action="store_true", help="Busca em comentários em vez de posts.")
+    parser.add_argument("--limit", type=int, default=20, help="Número máximo de resultados.")
+    args = parser.parse_args()
+
+    conn = setup_database(args.db_file)
+    if args.comments:
+        rows = search_comments(conn, args.match, start_date=args.since, end_date=args.until, limit=args.limit)
+        for comment_id, post_id, body, created_utc in rows:
+            date = datetime.fromtimestamp(created_utc or 0, timezone.utc).date()
+            print(f"{date}  {post_id}/{comment_id}  {body[:100]!r}")
+    else:
+        rows = search_posts(
+            conn, args.match, start_date=args.since, end_date=args.until,
+            min_length=args.min_length, limit=args.limit
+        )
+        for post_id, title, selftext, url, created_utc in rows:
+            date = datetime.fromtimestamp(created_utc, timezone.utc).date()
+            print(f"{date}  {post_id}  {title}  ({len(selftext)} caracteres)")
+    conn.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,365 @@
+import logging
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from ollamaPool import default_pool
+
+# Estimativa conservadora: ~3 caracteres por token (texto misto inglês/português com markdown).
+CHARS_PER_TOKEN = 3
+
+# Texto devolvido quando o modelo não gera o relatório (não é gravado em cache nem em checkpoint).
+GENERATION_ERROR = "Erro ao gerar resposta com Ollama."
+
+def estimate_tokens(text):
+    """
+    Estima o número de tokens de um texto sem depender do tokenizer do modelo.
+    """
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def remove_think_blocks(text):
+    """
+    Remove todo conteúdo que estiver entre <think>...</think>, incluindo as tags. Um bloco <think>
+    não fechado (resposta cortada) é descartado até o fim, como em ThinkBlockFilter.
+    """
+    return re.sub(r"<think>.*?(?:</think>|\Z)", "", text, flags=re.DOTALL)
+
+def partial_tag_length(text, tag):
+    """
+    Retorna o tamanho do maior sufixo de text que é início de tag (tag possivelmente cortada).
+    """
+    for size in range(min(len(tag) - 1, len(text)), 0, -1):
+        if text.endswith(tag[:size]):
+            return size
+    return 0
+
+class ThinkBlockFilter:
+    """
+    Versão incremental de remove_think_blocks para respostas em streaming.
+    Recebe pedaços arbitrários da resposta e devolve apenas o texto fora de <think>...</think>,
+    mesmo quando as tags chegam divididas entre pedaços. O raciocínio é descartado à medida que
+    chega, sem ser acumulado.
+    """
+
+    OPEN_TAG = "<think>"
+    CLOSE_TAG = "</think>"
+
+    def __init__(self):
+        self.inside = False
+        self.buffer = ""
+
+    def feed(self, text):
+        """
+        Processa um pedaço da resposta e retorna o texto limpo que já pode ser emitido.
+        """
+        self.buffer += text
+        output = []
+        while True:
+            tag = self.CLOSE_TAG if self.inside else self.OPEN_TAG
+            index = self.buffer.find(tag)
+            if index >= 0:
+                if not self.inside:
+                    output.append(self.buffer[:index])
+                self.buffer = self.buffer[index + len(tag):]
+                self.inside = not self.inside
+                continue
+            # Guarda apenas o possível início de uma tag cortada no fim do pedaço.
+            keep = partial_tag_length(self.buffer, tag)
+            if not self.inside:
+                output.append(self.buffer[:len(self.buffer) - keep])
+            self.buffer = self.buffer[len(self.buffer) - keep:]
+            return "".join(output)
+
+    def flush(self):
+        """
+        Retorna o texto restante ao fim do stream. Um bloco <think> não fechado é descartado.
+        """
+        text = "" if self.inside else self.buffer
+        self.buffer = ""
+        return text
+
+def check_budget(max_tokens):
+    """
+    Um orçamento de lote menor que 1 token não comporta nenhum texto (dividir o documento nunca
+    terminaria).
+    """
+    if max_tokens < 1:
+        raise ValueError(f"Orçamento de lote inválido ({max_tokens} tokens).")
+
+def split_oversized(document, max_tokens):
+    """
+    Divide um único documento maior que o orçamento em pedaços, preferindo quebras de parágrafo.
+    """
+    check_budget(max_tokens)
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    pieces = []
+    current = ""
+    for paragraph in document.split("\n\n"):
+        # Parágrafos gigantes (sem quebras) são cortados no limite de caracteres.
+        while len(paragraph) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(paragraph[:max_chars])
+            paragraph = paragraph[max_chars:]
+        candidate = f"{current}\n\n{paragraph}" if current else paragraph
+        if len(candidate) > max_chars:
+            pieces.append(current)
+            current = paragraph
+        else:
+            current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
+
+def chunk_documents(documents, max_tokens):
+    """
+    Agrupa documentos (um por post, já com seus comentários) em lotes que cabem em max_tokens,
+    sem quebrar posts entre lotes. Só posts maiores que o orçamento inteiro são divididos.
+    """
+    return list(iter_chunks(documents, max_tokens))
+
+def iter_chunks(documents, max_tokens):
+    """
+    Versão em fluxo de chunk_documents: consome os documentos sob demanda e entrega cada lote
+    assim que ele fecha, mantendo em memória só o lote atual.
+    """
+    check_budget(max_tokens)
+    current = []
+    current_tokens = 0
+    for document in documents:
+        tokens = estimate_tokens(document)
+        if tokens > max_tokens:
+            pieces = split_oversized(document, max_tokens)
+        else:
+            pieces = [document]
+        for piece in pieces:
+            tokens = estimate_tokens(piece)
+            if current and current_tokens + tokens > max_tokens:
+                yield "\n".join(current)
+                current = []
+                current_tokens = 0
+            current.append(piece)
+            current_tokens += tokens
+    if current:
+        yield "\n".join(current)
+
+def bounded_map(executor, fn, items, max_pending):
+    """
+    Como executor.map, mas consome items aos poucos: no máximo max_pending tarefas ficam
+    submetidas ao mesmo tempo, e os resultados são entregues na ordem de items.
+    """
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def stream_generate(prompt, model="deepseek-r1", options=None, on_text=None, metrics=None, pool=None,
+                    keep_alive=None):
+    """
+    Gera a resposta em streaming (stream=True), removendo os blocos <think> à medida que os
+    tokens chegam. on_text recebe cada trecho de texto limpo assim que ele fica disponível.
+    O último pedaço do stream traz as contagens de tokens, registradas em metrics.
+    Retorna a resposta limpa completa.
+    """
+    think_filter = ThinkBlockFilter()
+    pieces = []
+
+    def emit(text):
+        # Descarta o espaço em branco que sobra no início depois do bloco <think>.
+        if not pieces:
+            text = text.lstrip()
+        if text:
+            pieces.append(text)
+            if on_text is not None:
+                on_text(text)
+
+    part = None
+    pool = pool or default_pool()
+    for part in pool.generate(model, prompt, options, keep_alive, stream=True):
+        emit(think_filter.feed(part["response"]))
+    emit(think_filter.flush())
+    if metrics is not None and part is not None:
+        metrics.record_generation(part)
+    return "".join(pieces).strip()
+
+def generate(prompt, model="deepseek-r1", options=None, cache=None, on_text=None, metrics=None, pool=None,
+             keep_alive=None):
+    """
+    Envia um prompt ao Ollama e retorna o texto da resposta, sem os blocos <think>.
+    A chamada passa pelo pool (OllamaPool; por padrão, o servidor local) com o keep_alive dado.
+    Se um GenerationCache for informado, respostas para o mesmo (modelo, opções, prompt)
+    são reaproveitadas sem chamar o modelo (respostas vazias ou malformadas não são guardadas).
+    Se on_text for informado, a resposta é gerada em streaming e entregue aos poucos.
+    Se metrics (RunMetrics) for informado, registra tokens e durações informados pelo Ollama.
+    """
+    key = None
+    if cache is not None:
+        key = cache.make_key(model, options, prompt)
+        cached = cache.get(key)
+        # Respostas vazias gravadas por versões anteriores não contam como acerto.
+        if cached:
+            if metrics is not None:
+                metrics.count("llm_cache_hits")
+            if on_text is not None:
+                on_text(cached)
+            return cached
+    if on_text is not None:
+        text = stream_generate(prompt, model, options, on_text, metrics, pool, keep_alive)
+    else:
+        response = (pool or default_pool()).generate(model, prompt, options, keep_alive)
+        if metrics is not None:
+            metrics.record_generation(response)
+        text = remove_think_blocks(response["response"]).strip()
+    if cache is not None and is_cacheable(text):
+        cache.put(key, model, text)
+    return text
+
+def is_cacheable(text):
+    """
+    Indica se a resposta pode ir para o cache (ou checkpoint): respostas vazias ou com tags de
+    raciocínio restantes (cortadas ou malformadas) seriam reaproveitadas para sempre.
+    """
+    return bool(text) and "<think>" not in text and "</think>" not in text
+
+def map_reduce_generate(documents, build_map_prompt, build_reduce_prompt, model="deepseek-r1",
+                        num_ctx=8192, num_predict=2048, max_workers=2, cache=None, on_text=None,
+                        executor=None, metrics=None, checkpoint=None, pool=None, keep_alive=None,
+                        extra_options=None):
+    """
+    Analisa um corpus arbitrariamente grande em etapas que cabem no contexto do modelo.
+    - map: cada lote de documentos vira build_map_prompt(lote) e é extraído em paralelo.
+    - reduce: as extrações parciais são combinadas com build_reduce_prompt(parciais).
+      Se as parciais não couberem em um único prompt, são condensadas de novo pelo map.
+
+    num_ctx é o contexto configurado no Ollama; num_predict é o espaço reservado para a resposta
+    ao dimensionar os lotes e o limite de cada extração do map (assim as extrações sempre cabem,
+    juntas, em menos lotes); o relatório final só é limitado por extra_options["num_predict"].
+    extra_options são outras opções de geração do Ollama (temperature, top_p...); pool e
+    keep_alive definem onde e por quanto tempo o modelo fica carregado (ver OllamaPool).
+    Com cache (GenerationCache), só lotes cujo conteúdo mudou chegam ao modelo.
+    Com on_text, o relatório final (reduce) é gerado em streaming e entregue aos poucos.
+    executor é um ThreadPoolExecutor opcional compartilhado entre análises simultâneas, que passa
+    a limitar o total de chamadas ao Ollama (max_workers então só limita os lotes pendentes).
+    Com metrics (RunMetrics), registra o tempo de montagem dos lotes (etapa "prompts"), que
+    inclui a leitura dos documentos, e as estatísticas de cada geração.
+
+    documents pode ser um gerador: os lotes são montados sob demanda e no máximo 2 * max_workers
+    ficam em memória aguardando o modelo; só as extrações parciais (curtas) são acumuladas.
+
+    Com checkpoint (RunCheckpoint), cada lote e a sua extração são gravados assim que ficam
+    prontos; ao retomar uma execução, lotes já extraídos não voltam ao modelo e, se todos os
+    lotes já tinham sido montados, os documentos nem são lidos.
+    """
+    options = {**(extra_options or {}), "num_ctx": num_ctx}
+    map_options = {**options, "num_predict": options.get("num_predict", num_predict)}
+
+    def budget_for(build_prompt):
+        budget = num_ctx - num_predict - estimate_tokens(build_prompt(""))
+        if budget < 1:
+            raise ValueError(
+                f"num_ctx ({num_ctx}) não comporta num_predict ({num_predict}) e as instruções do prompt; "
+                "aumente num_ctx ou reduza num_predict."
+            )
+        return budget
+
+    map_budget = budget_for(build_map_prompt)
+    reduce_budget = budget_for(build_reduce_prompt)
+
+    def timed_chunks(items, step):
+        # Mede só o tempo gasto montando os lotes (leitura dos documentos incluída).
+        chunks = iter_chunks(items, map_budget)
+        elapsed = 0.0
+        count = 0
+        while True:
+            start = time.perf_counter()
+            chunk = next(chunks, None)
+            elapsed += time.perf_counter() - start
+            if chunk is None:
+                break
+            output = checkpoint.save_chunk(step, count, chunk) if checkpoint is not None else None
+            yield count, chunk, output
+            count += 1
+        if metrics is not None:
+            metrics.add_time("prompts", elapsed)
+            metrics.count("llm_map_chunks", count)
+        if checkpoint is not None:
+            checkpoint.complete(f"chunks:{step}", str(count))
+
+    def run_map(items, step):
+        """
+        Extrai todos os lotes da etapa. Se algum falhar, os lotes seguintes não vão mais ao modelo
+        e retorna None: um relatório sem parte do corpus seria dado como concluído e os lotes
+        perdidos não voltariam com --resume (os já extraídos ficam no checkpoint).
+        """
+        logging.info("Extraindo insights dos lotes...")
+        chunks = checkpoint.iter_chunks(step) if checkpoint is not None else None
+        if chunks is None:
+            chunks = timed_chunks(items, step)
+        else:
+            logging.info(f"Retomando lotes já montados da etapa {step}.")
+        failed = threading.Event()
+
+        def extract(item):
+            seq, chunk, output = item
+            if output:
+                if metrics is not None:
+                    metrics.count("llm_resumed_chunks")
+                return output
+            if failed.is_set():
+                return None
+            try:
+                output = generate(
+                    build_map_prompt(chunk), model, map_options, cache, metrics=metrics, pool=pool, keep_alive=keep_alive
+                )
+            except Exception as e:
+                logging.error(f"Erro ao gerar resposta com Ollama: {e}")
+                failed.set()
+                return None
+            if checkpoint is not None and is_cacheable(output):
+                checkpoint.save_output(step, seq, output)
+            return output
+
+        if executor is not None:
+            partials = list(bounded_map(executor, extract, chunks, 2 * max_workers))
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers) as own_executor:
+                partials = list(bounded_map(own_executor, extract, chunks, 2 * max_workers))
+        missing = sum(1 for partial in partials if partial is None)
+        if missing:
+            logging.error(f"{missing} de {len(partials)} lotes sem extração; análise interrompida.")
+            return None
+        logging.info(f"Insights extraídos de {len(partials)} lotes.")
+        return [partial for partial in partials if partial]
+
+    rounds = 1
+    partials = run_map(documents, f"map{rounds}")
+    if not partials:
+        return GENERATION_ERROR
+
+    while len(partials) > 1 and estimate_tokens("\n\n".join(partials)) > reduce_budget:
+        previous = len(partials)
+        rounds += 1
+        partials = run_map(partials, f"map{rounds}")
+        if not partials:
+            return GENERATION_ERROR
+        if len(partials) >= previous:
+            # Cada lote só comporta uma extração: nenhuma rodada vai reduzir o número delas.
+            raise ValueError(
+                f"As extrações parciais não diminuem entre as rodadas ({len(partials)} lotes); "
+                "aumente num_ctx ou reduza num_predict."
+            )
+
+    logging.info(f"Combinando {len(partials)} extrações parciais no relatório final...")
+    try:
+        return generate(
+            build_reduce_prompt("\n\n".join(partials)), model, options, cache, on_text, metrics, pool, keep_alive
+        )
+    except Exception as e:
+        logging.error(f"Erro ao gerar resposta com Ollama: {e}")
+        return GENERATION_ERROR
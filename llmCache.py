@@ -0,0 +1,109 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+class GenerationCache:
+    """
+    Cache persistente de respostas do LLM, endereçado pelo conteúdo.
+    A chave é o SHA-256 de (modelo, opções de geração, prompt final); as entradas ficam na
+    tabela llm_cache do próprio banco SQLite do exame. Pode ser usado por várias threads.
+    """
+
+    def __init__(self, db_file, max_age_days=30, max_bytes=50 * 1024 * 1024):
+        self.max_age_days = max_age_days
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                response TEXT,
+                size INTEGER,
+                created_at REAL,
+                last_used_at REAL
+            );
+        ''')
+        self.conn.commit()
+
+    @staticmethod
+    def make_key(model, options, prompt):
+        """
+        Gera a chave de cache a partir do modelo, das opções e do prompt.
+        """
+        payload = json.dumps([model, options or {}, prompt], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        Retorna a resposta armazenada para a chave, ou None.
+        """
+        with self._lock:
+            row = self.conn.execute("SELECT response FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.conn.execute("UPDATE llm_cache SET last_used_at = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+            return row[0]
+
+    def put(self, key, model, response):
+        """
+        Armazena a resposta gerada para a chave.
+        """
+        now = time.time()
+        with self._lock:
+            self.conn.execute('''
+                INSERT OR REPLACE INTO llm_cache (key, model, response, size, created_at, last_used_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (key, model, response, len(response.encode("utf-8")), now, now))
+            self.conn.commit()
+
+    def evict(self):
+        """
+        Remove entradas mais antigas que max_age_days e, se o cache ainda passar de max_bytes,
+        as menos usadas recentemente. Retorna quantas entradas foram removidas.
+        """
+        with self._lock:
+            cutoff = time.time() - self.max_age_days * 86400
+            removed = self.conn.execute("DELETE FROM llm_cache WHERE last_used_at < ?", (cutoff,)).rowcount
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+            if total > self.max_bytes:
+                for key, size in self.conn.execute(
+                    "SELECT key, size FROM llm_cache ORDER BY last_used_at"
+                ).fetchall():
+                    if total <= self.max_bytes:
+                        break
+                    self.conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    total -= size
+                    removed += 1
+            self.conn.commit()
+        return removed
+
+    def stats(self):
+        """
+        Retorna estatísticas de uso do cache nesta execução e do armazenamento atual.
+        """
+        with self._lock:
+            entries, total = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+            ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": total}
+
+    def close(self):
+        """
+        Aplica a política de expiração, registra as estatísticas e fecha a conexão.
+        """
+        removed = self.evict()
+        stats = self.stats()
+        logging.info(
+            f"Cache do LLM: {stats['hits']} acertos, {stats['misses']} faltas, "
+            f"{stats['entries']} entradas ({stats['bytes']} bytes), {removed} removidas."
+        )
+        self.conn.close()
@@ -0,0 +1,216 @@
+import re
+import hashlib
+import logging
+
+from insightsStore import NON_REDUNDANT_COMMENT, post_filter_sql
+from llmAnalysis import CHARS_PER_TOKEN
+
+# Assinaturas SimHash de 64 bits sobre trigramas de palavras. Textos com distância de Hamming
+# até MAX_HAMMING_DISTANCE são considerados quase-duplicatas (cross-posts, citações, modelos de
+# "I passed" quase idênticos).
+SIMHASH_BITS = 64
+SHINGLE_SIZE = 3
+MAX_HAMMING_DISTANCE = 3
+# LSH: com 4 faixas de 16 bits, duas assinaturas a até 3 bits de distância coincidem em pelo
+# menos uma faixa, então só os itens que compartilham uma faixa precisam ser comparados.
+LSH_BANDS = 4
+BAND_BITS = SIMHASH_BITS // LSH_BANDS
+
+# Respostas com menos palavras de conteúdo que isto ("Congrats!", "Thanks, good luck") são descartadas.
+MIN_CONTENT_WORDS = 5
+FILLER_WORDS = {
+    "congrats", "congratulations", "congratz", "grats", "gz", "gg", "well", "done", "good", "job",
+    "great", "nice", "awesome", "amazing", "luck", "thanks", "thank", "you", "ty", "man", "dude",
+    "bro", "mate", "sir", "yes", "yeah", "lol", "wow", "cool", "proud", "happy", "for", "on",
+    "the", "a", "and", "to", "i", "im", "it", "is", "so", "too", "much", "very", "really", "this",
+    "that", "your", "my", "me", "of", "in", "all", "best", "same", "here", "btw", "u", "op",
+    "parabéns", "parabens", "obrigado", "valeu", "boa", "sorte", "deleted", "removed",
+}
+
+def words_of(text):
+    return re.findall(r"\w+", (text or "").lower())
+
+def simhash(text):
+    """
+    Calcula a assinatura SimHash (64 bits, como inteiro com sinal para caber no SQLite).
+    """
+    words = words_of(text)
+    shingles = {}
+    for i in range(max(1, len(words) - SHINGLE_SIZE + 1)):
+        shingle = " ".join(words[i:i + SHINGLE_SIZE])
+        shingles[shingle] = shingles.get(shingle, 0) + 1
+    totals = [0] * SIMHASH_BITS
+    for shingle, weight in shingles.items():
+        value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            totals[bit] += weight if value >> bit & 1 else -weight
+    signature = sum(1 << bit for bit in range(SIMHASH_BITS) if totals[bit] > 0)
+    return signature - (1 << SIMHASH_BITS) if signature >= 1 << (SIMHASH_BITS - 1) else signature
+
+def hamming_distance(a, b):
+    return bin((a ^ b) & ((1 << SIMHASH_BITS) - 1)).count("1")
+
+def is_low_content(text):
+    """
+    Indica se a resposta não tem conteúdo útil (só agradecimentos, parabéns ou removida).
+    """
+    return sum(1 for word in words_of(text) if word not in FILLER_WORDS) < MIN_CONTENT_WORDS
+
+class SignatureIndex:
+    """
+    Índice LSH em memória das assinaturas já calculadas de uma tabela.
+    """
+
+    def __init__(self):
+        self.bands = [{} for _ in range(LSH_BANDS)]
+        self.canonical = {}
+
+    def band_keys(self, signature):
+        return [(signature >> (band * BAND_BITS)) & ((1 << BAND_BITS) - 1) for band in range(LSH_BANDS)]
+
+    def add(self, item_id, signature, duplicate_of=None):
+        self.canonical[item_id] = duplicate_of or item_id
+        for band, key in zip(self.bands, self.band_keys(signature)):
+            band.setdefault(key, []).append((item_id, signature))
+
+    def find(self, signature, item_id=None):
+        """
+        Retorna o id original (canônico) de um item quase idêntico já indexado, ou None.
+        Com item_id (linha cuja assinatura está sendo recalculada), a própria linha e as suas
+        cópias são ignoradas: um original nunca vira duplicata de si mesmo nem das cópias.
+        """
+        for band, key in zip(self.bands, self.band_keys(signature)):
+            for other_id, other in band.get(key, ()):
+                canonical = self.canonical[other_id]
+                if item_id is not None and item_id in (other_id, canonical):
+                    continue
+                if hamming_distance(signature, other) <= MAX_HAMMING_DISTANCE:
+                    return canonical
+        return None
+
+def update_table_signatures(conn, table, text_sql, batch_size=500):
+    """
+    Calcula assinaturas só para as linhas novas (simhash nulo) e marca as quase-duplicatas de
+    linhas mais antigas. Retorna (linhas processadas, duplicatas encontradas).
+    """
+    # Linhas marcadas como duplicatas de si mesmas (gravadas por versões anteriores) são refeitas.
+    with conn:
+        conn.execute(f"UPDATE {table} SET simhash = NULL, duplicate_of = NULL WHERE duplicate_of = id")
+    index = SignatureIndex()
+    for item_id, signature, duplicate_of in conn.execute(
+        f"SELECT id, simhash, duplicate_of FROM {table} WHERE simhash IS NOT NULL"
+    ):
+        index.add(item_id, signature, duplicate_of)
+
+    # Do mais antigo para o mais novo: o original é sempre o primeiro publicado. Só os ids ficam
+    # em memória; o texto é lido e as assinaturas gravadas um lote por vez.
+    pending = [row[0] for row in conn.execute(
+        f"SELECT id FROM {table} WHERE simhash IS NULL ORDER BY created_utc"
+    )]
+    columns = "simhash = ?, duplicate_of = ?"
+    if table == "comments":
+        columns += ", low_content = ?"
+    duplicates = 0
+    for i in range(0, len(pending), batch_size):
+        batch = pending[i:i + batch_size]
+        texts = dict(conn.execute(
+            f"SELECT id, {text_sql} FROM {table} WHERE id IN ({', '.join('?' * len(batch))})", batch
+        ))
+        rows = []
+        for item_id in batch:
+            text = texts.get(item_id)
+            signature = simhash(text)
+            duplicate_of = index.find(signature, item_id)
+            if duplicate_of is not None:
+                duplicates += 1
+            index.add(item_id, signature, duplicate_of)
+            row = (signature, duplicate_of, item_id)
+            if table == "comments":
+                row = (signature, duplicate_of, int(is_low_content(text)), item_id)
+            rows.append(row)
+        with conn:
+            conn.executemany(f"UPDATE {table} SET {columns} WHERE id = ?", rows)
+    return len(pending), duplicates
+
+def update_signatures(conn):
+    """
+    Atualiza, de forma incremental, as assinaturas de posts e comentários do banco.
+    """
+    posts, duplicate_posts = update_table_signatures(
+        conn, "posts", "COALESCE(title, '') || ' ' || COALESCE(selftext, '')"
+    )
+    comments, duplicate_comments = update_table_signatures(conn, "comments", "comment_body")
+    logging.info(
+        f"Assinaturas calculadas para {posts} posts ({duplicate_posts} quase-duplicatas) e "
+        f"{comments} comentários ({duplicate_comments} quase-duplicatas)."
+    )
+
+def corpus_size(conn, match=None, start_date=None, end_date=None, min_length=None,
+                include_comments=True, skip_redundant=False, limit=None, top_comments=None,
+                post_ids=None):
+    """
+    Retorna (posts, comentários, caracteres, bytes) do corpus que passa pelos filtros, com os
+    mesmos cortes da montagem dos documentos (iter_post_documents): limit mantém os posts mais
+    novos, post_ids restringe aos posts informados e top_comments mantém só as N respostas diretas
+    de maior pontuação de cada post (posts sem profundidade registrada mantêm todas).
+    """
+    filters, params = post_filter_sql(match, start_date, end_date, min_length, skip_redundant, post_ids)
+    selected = f"SELECT p.id, p.title, p.selftext, p.url {filters} ORDER BY p.created_utc DESC"
+    if limit is not None:
+        selected += " LIMIT ?"
+        params.append(limit)
+    text = "COALESCE(title, '') || COALESCE(selftext, '') || COALESCE(url, '')"
+    posts, chars, size = conn.execute(f'''
+        WITH selected AS ({selected})
+        SELECT COUNT(*), COALESCE(SUM(length({text})), 0), COALESCE(SUM(length(CAST({text} AS BLOB))), 0)
+        FROM selected
+    ''', params).fetchone()
+    comments = 0
+    if include_comments:
+        useful = NON_REDUNDANT_COMMENT if skip_redundant else "1"
+        kept = "1"
+        comment_params = list(params)
+        if top_comments is not None:
+            # Mesma seleção de load_comment_bodies: respostas diretas por score decrescente e rowid.
+            kept = "NOT has_depth OR (depth = 0 AND position <= ?)"
+            comment_params.append(top_comments)
+        comments, comment_chars, comment_size = conn.execute(f'''
+            WITH selected AS ({selected}),
+            candidates AS (
+                SELECT rowid AS comment_rowid, post_id, comment_body, score, depth, {useful} AS useful,
+                    MAX(depth IS NOT NULL) OVER (PARTITION BY post_id) AS has_depth
+                FROM comments WHERE post_id IN (SELECT id FROM selected)
+            ),
+            ranked AS (
+                SELECT comment_body, depth, has_depth, ROW_NUMBER() OVER (
+                    PARTITION BY post_id, depth = 0 ORDER BY score DESC, comment_rowid
+                ) AS position
+                FROM candidates WHERE useful
+            )
+            SELECT COUNT(*), COALESCE(SUM(length(comment_body)), 0),
+                COALESCE(SUM(length(CAST(comment_body AS BLOB))), 0)
+            FROM ranked WHERE {kept}
+        ''', comment_params).fetchone()
+        chars += comment_chars
+        size += comment_size
+    return posts, comments, chars, size
+
+def redundancy_report(conn, match=None, start_date=None, end_date=None, min_length=None,
+                      include_comments=True, limit=None, top_comments=None, post_ids=None):
+    """
+    Compara o corpus filtrado com e sem a deduplicação: posts e comentários retirados e
+    bytes e tokens (estimados) economizados. limit, top_comments e post_ids recortam o corpus
+    como na montagem dos documentos (ver corpus_size).
+    """
+    cuts = {"limit": limit, "top_comments": top_comments, "post_ids": post_ids}
+    before = corpus_size(conn, match, start_date, end_date, min_length, include_comments, **cuts)
+    after = corpus_size(
+        conn, match, start_date, end_date, min_length, include_comments, skip_redundant=True, **cuts
+    )
+    return {
+        "posts_removed": before[0] - after[0],
+        "comments_removed": before[1] - after[1],
+        "bytes_saved": before[3] - after[3],
+        "tokens_saved": (before[2] - after[2]) // CHARS_PER_TOKEN,
+        "tokens_after": after[2] // CHARS_PER_TOKEN,
+    }
@@ -0,0 +1,232 @@
+import time
+import logging
+import threading
+
+# Chamadas simultâneas por servidor quando a configuração não informa o limite.
+DEFAULT_HOST_CONCURRENCY = 2
+# Tempo que o Ollama mantém o modelo carregado depois da última chamada (evita recarregar o
+# modelo entre lotes e entre execuções próximas).
+DEFAULT_KEEP_ALIVE = "30m"
+# Tentativas por geração (no mesmo servidor ou em outro) antes de desistir.
+MAX_ATTEMPTS = 3
+# Um servidor que falha fica fora da escala por RETRY_DELAY * 2^(falhas seguidas - 1) segundos,
+# até MAX_RETRY_DELAY.
+RETRY_DELAY = 1.0
+MAX_RETRY_DELAY = 60.0
+# Se todos os servidores estiverem fora da escala, uma chamada espera pelo primeiro a voltar por
+# até MAX_BACKOFF_WAIT segundos (quedas curtas do Ollama não interrompem a análise); se nenhum
+# voltar nesse prazo, falha na hora (OllamaUnavailable) e a execução pode ser retomada depois.
+MAX_BACKOFF_WAIT = 30.0
+
+class OllamaUnavailable(RuntimeError):
+    """
+    Todos os servidores Ollama estão fora da escala após falhas seguidas.
+    """
+
+def is_client_error(error):
+    """
+    Indica se o Ollama recusou a requisição em si (HTTP 4xx: modelo inexistente, opção inválida,
+    prompt malformado). Repetir não adianta e o servidor continua saudável.
+    """
+    status = getattr(error, "status_code", None)
+    return isinstance(status, int) and 400 <= status < 500
+
+def parse_keep_alive(value):
+    """
+    Converte o keep_alive da linha de comando: números são segundos (-1 mantém o modelo
+    carregado indefinidamente); o resto é uma duração do Ollama ("30m", "1h").
+    """
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+class OllamaHost:
+    """
+    Um servidor Ollama: cliente HTTP reutilizado em todas as chamadas (o ollama.Client mantém o
+    pool de conexões), limite de chamadas simultâneas e estado de falhas.
+    """
+
+    def __init__(self, url=None, limit=DEFAULT_HOST_CONCURRENCY):
+        import ollama
+
+        self.url = url
+        self.name = url or "padrão"
+        self.limit = limit
+        self.client = ollama.Client(host=url)
+        self.active = 0
+        self.consecutive_failures = 0
+        self.down_until = 0.0
+        self.stats = {"calls": 0, "failures": 0, "seconds": 0.0}
+
+def parse_host(spec):
+    """
+    Converte "URL" ou "URL=N" (N chamadas simultâneas) em OllamaHost.
+    """
+    url, sep, limit = spec.rpartition("=")
+    if not sep or not limit.isdigit():
+        return OllamaHost(spec)
+    return OllamaHost(url, int(limit))
+
+class OllamaPool:
+    """
+    Distribui as gerações entre um ou mais servidores Ollama. Cada chamada vai para o servidor
+    saudável com mais capacidade livre (proporcionalmente ao seu limite) e espera se todos
+    estiverem ocupados. Se a chamada falhar, o servidor sai da escala por um tempo e a geração é
+    repetida em outro (ou no mesmo, depois de uma espera limitada); requisições recusadas pelo
+    Ollama (4xx) não são repetidas. Pode ser usado por várias threads.
+    """
+
+    def __init__(self, hosts=None, keep_alive=DEFAULT_KEEP_ALIVE, max_attempts=MAX_ATTEMPTS):
+        self.hosts = hosts or [OllamaHost()]
+        self.keep_alive = keep_alive
+        self.max_attempts = max_attempts
+        self._condition = threading.Condition()
+
+    @classmethod
+    def from_specs(cls, specs, keep_alive=DEFAULT_KEEP_ALIVE):
+        """
+        Cria o pool a partir de especificações "URL" ou "URL=N" (ver parse_host).
+        """
+        return cls([parse_host(spec) for spec in specs or []], keep_alive)
+
+    @property
+    def capacity(self):
+        """
+        Total de chamadas simultâneas somando todos os servidores.
+        """
+        return sum(host.limit for host in self.hosts)
+
+    def acquire(self):
+        """
+        Reserva uma vaga no servidor mais livre, esperando se necessário. Servidores em espera
+        após falhas só são usados quando não há nenhum outro disponível; se todos estiverem em
+        espera além de MAX_BACKOFF_WAIT, levanta OllamaUnavailable em vez de aguardar.
+        """
+        with self._condition:
+            deadline = time.monotonic() + MAX_BACKOFF_WAIT
+            while True:
+                now = time.monotonic()
+                free = [host for host in self.hosts if host.active < host.limit]
+                healthy = [host for host in free if host.down_until <= now]
+                if healthy:
+                    host = min(healthy, key=lambda host: host.active / host.limit)
+                    host.active += 1
+                    return host
+                back_at = min(host.down_until for host in self.hosts)
+                back_in = back_at - now
+                if back_at > deadline:
+                    raise OllamaUnavailable(
+                        f"Nenhum servidor Ollama disponível (o primeiro volta em {back_in:.0f}s)."
+                    )
+                if free:
+                    # Os servidores livres estão em espera: aguarda o primeiro a voltar (ou uma vaga).
+                    timeout = min(host.down_until for host in free) - now
+                else:
+                    timeout = None
+                self._condition.wait(timeout)
+
+    def release(self, host, started, error=None):
+        with self._condition:
+            host.active -= 1
+            host.stats["calls"] += 1
+            host.stats["seconds"] += time.perf_counter() - started
+            if error is None:
+                host.consecutive_failures = 0
+            else:
+                host.stats["failures"] += 1
+                host.consecutive_failures += 1
+                delay = min(RETRY_DELAY * 2 ** (host.consecutive_failures - 1), MAX_RETRY_DELAY)
+                host.down_until = time.monotonic() + delay
+                logging.warning(f"Falha no Ollama em {host.name} ({error}); fora da escala por {delay:.0f}s.")
+            self._condition.notify_all()
+
+    def generate(self, model, prompt, options=None, keep_alive=None, stream=False):
+        """
+        Equivalente a ollama.generate, escalonado entre os servidores, com nova tentativa em
+        caso de falha. Com stream=True, retorna um gerador; a vaga fica reservada até o fim do
+        stream, e só falhas antes do primeiro pedaço são repetidas.
+        """
+        if stream:
+            return self.stream(model, prompt, options, keep_alive)
+        keep_alive = self.keep_alive if keep_alive is None else keep_alive
+        for attempt in range(1, self.max_attempts + 1):
+            host = self.acquire()
+            started = time.perf_counter()
+            try:
+                response = host.client.generate(model=model, prompt=prompt, options=options, keep_alive=keep_alive)
+            except Exception as e:
+                if is_client_error(e):
+                    self.release(host, started)
+                    raise
+                self.release(host, started, e)
+                if attempt == self.max_attempts:
+                    raise
+                continue
+            self.release(host, started)
+            return response
+
+    def stream(self, model, prompt, options=None, keep_alive=None):
+        keep_alive = self.keep_alive if keep_alive is None else keep_alive
+        for attempt in range(1, self.max_attempts + 1):
+            host = self.acquire()
+            started = time.perf_counter()
+            received = False
+            try:
+                for part in host.client.generate(
+                    model=model, prompt=prompt, options=options, keep_alive=keep_alive, stream=True
+                ):
+                    received = True
+                    yield part
+            except Exception as e:
+                if is_client_error(e):
+                    self.release(host, started)
+                    raise
+                self.release(host, started, e)
+                if received or attempt == self.max_attempts:
+                    raise
+                continue
+            except BaseException:
+                # Stream abandonado por quem o consumia (GeneratorExit): só libera a vaga.
+                self.release(host, started)
+                raise
+            self.release(host, started)
+            return
+
+    def preload(self, models):
+        """
+        Carrega os modelos em todos os servidores, em segundo plano (um prompt vazio faz o
+        Ollama carregar o modelo e mantê-lo por keep_alive), para que a análise não espere por
+        carregamentos a frio. Falhas são só registradas.
+        """
+        def load(host, model):
+            try:
+                host.client.generate(model=model, prompt="", keep_alive=self.keep_alive)
+                logging.info(f"Modelo {model} carregado em {host.name}.")
+            except Exception as e:
+                logging.warning(f"Não foi possível pré-carregar {model} em {host.name}: {e}")
+
+        for host in self.hosts:
+            for model in models:
+                threading.Thread(target=load, args=(host, model), name="ollama-preload", daemon=True).start()
+
+    def log_stats(self):
+        for host in self.hosts:
+            stats = host.stats
+            logging.info(
+                f"Ollama {host.name}: {stats['calls']} chamadas, {stats['failures']} falhas, "
+                f"{stats['seconds']:.1f}s ocupado (limite {host.limit} simultâneas)."
+            )
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+def default_pool():
+    """
+    Pool com um único servidor (OLLAMA_HOST ou localhost), usado quando nenhum é informado.
+    """
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = OllamaPool()
+        return _default_pool
@@ -1,129 +1,35 @@
-import os
-import praw
-import sqlite3
-import logging
-from datetime import datetime, timezone
-import ollama
-import re
-
-# Biblioteca para tradução
-from deep_translator import GoogleTranslator
-
-def setup_logging():
-    """
-    Configura o logging para o script.
-    """
-    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
-def load_api_keys():
-    """
-    Carrega as API keys a partir das variáveis de ambiente (apenas do Reddit, neste caso).
-    """
-    CLIENT_ID = os.getenv("REDDIT_CLIENT_ID")
-    CLIENT_SECRET = os.getenv("REDDIT_CLIENT_SECRET")
-    USER_AGENT = os.getenv("REDDIT_USER_AGENT")
-
-    if not all([CLIENT_ID, CLIENT_SECRET, USER_AGENT]):
-        raise ValueError("❌ Missing Reddit API keys! Verifique as variáveis de ambiente.")
-    return CLIENT_ID, CLIENT_SECRET, USER_AGENT
-
-def initialize_reddit(client_id, client_secret, user_agent):
-    """
-    Inicializa a API do Reddit utilizando a biblioteca PRAW.
-    """
-    return praw.Reddit(
-        client_id=client_id,
-        client_secret=client_secret,
-        user_agent=user_agent
-    )
-
-def setup_database(db_file="oscp_posts.db"):
-    """
-    Configura o banco de dados SQLite e cria as tabelas necessárias para posts e comentários.
-    """
-    conn = sqlite3.connect(db_file)
-    cur = conn.cursor()
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS posts (
-            id TEXT PRIMARY KEY,
-            title TEXT,
-            selftext TEXT,
-            url TEXT,
-            created_utc REAL
-        );
-    ''')
-    cur.execute('''
-        CREATE TABLE IF NOT EXISTS comments (
-            id TEXT PRIMARY KEY,
-            post_id TEXT,
-            comment_body TEXT,
-            created_utc REAL,
-            FOREIGN KEY (post_id) REFERENCES posts (id)
-        );
-    ''')
-    conn.commit()
-    return conn
-
-def is_useful_post(post):
-    """
-    Filtra posts que são detalhados e úteis para preparação do OSCP.
-    """
-    content = f"{post.title} {post.selftext}".lower()
-    useful_keywords = [
-        "study", "methodology", "privilege escalation", "active directory",
-        "tools", "practice", "proving grounds", "htb", "time management",
-        "exam strategy", "report writing", "buffer overflow", "initial foothold"
-    ]
-    return any(keyword in content for keyword in useful_keywords) and len(post.selftext) > 700
-
-def collect_posts(subreddit, search_query, start_date, end_date):
-    """
-    Coleta posts do subreddit que atendem aos critérios de data e utilidade.
-    """
-    posts = []
-    for post in subreddit.search(search_query, sort="new", time_filter="all"):
-        post_timestamp = post.created_utc
-        if start_date <= post_timestamp <= end_date and is_useful_post(post):
-            posts.append(post)
-    return posts
-
-def save_posts_to_db(conn, posts):
-    """
-    Salva os posts e seus comentários no banco de dados SQLite.
-    """
-    cur = conn.cursor()
-    for post in posts:
-        try:
-            cur.execute('''
-                INSERT OR IGNORE INTO posts (id, title, selftext, url, created_utc)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (post.id, post.title, post.selftext, post.url, post.created_utc))
-        except Exception as e:
-            logging.error(f"Erro ao salvar o post {post.id}: {e}")
-        
-        # Carregar e salvar todos os comentários do post
-        try:
-            post.comments.replace_more(limit=0)
-            for comment in post.comments.list():
-                try:
-                    cur.execute('''
-                        INSERT OR IGNORE INTO comments (id, post_id, comment_body, created_utc)
-                        VALUES (?, ?, ?, ?)
-                    ''', (comment.id, post.id, comment.body, getattr(comment, 'created_utc', None)))
-                except Exception as e:
-                    logging.error(f"Erro ao salvar o comentário {comment.id}: {e}")
-        except Exception as e:
-            logging.error(f"Erro ao processar comentários do post {post.id}: {e}")
-    conn.commit()
+# Configuração e prompts do OSCP; coleta, análise e tradução ficam no pipeline compartilhado
+from examPipeline import run_single_exam
+
+# Palavras-chave e tamanho mínimo que definem um relato útil (usados na coleta e em SQL no modo offline)
+USEFUL_KEYWORDS = [
+    "study", "methodology", "privilege escalation", "active directory",
+    "tools", "practice", "proving grounds", "htb", "time management",
+    "exam strategy", "report writing", "buffer overflow", "initial foothold"
+]
+MIN_SELFTEXT_LENGTH = 700
+TOP_COMMENTS = 10
+
+def build_oscp_extraction_prompt(posts_text):
+    """
+    Prompt da etapa map: extrai, de um lote de relatos, as práticas citadas em forma de notas curtas.
+    """
+    return f"""
+Você está lendo um lote de relatos de candidatos aprovados no OSCP.
+Liste, em notas curtas, todas as ferramentas, recursos de estudo, ambientes de prática, técnicas de
+enumeração, escalonamento de privilégios e ataques a Active Directory, erros comuns, dicas de gestão
+de tempo e de escrita de relatório mencionados.
+Para cada item, indique quantos relatos do lote o citam e um exemplo concreto.
+Não escreva introdução nem conclusão.
+
+**Relatos:**
+{posts_text}
+"""
 
-def analyze_oscp_success(posts_text):
+def build_oscp_report_prompt(notes_text):
     """
-    Utiliza a biblioteca ollama para enviar o prompt ao Ollama (LLM local).
-    Retorna o texto processado como resposta.
+    Prompt da etapa reduce: combina as notas de todos os lotes no relatório final.
     """
-    # Crie uma instância do cliente ollama, se desejar customizar a base_url.
-    client = ollama.Client()
-
     # Prompt do "system" (contexto) e do "usuário" (pedido principal).
     system_prompt = (
         "Você é um mentor de cibersegurança ofensiva com 15 anos de experiência prática em exploitation.\n\n"
@@ -155,93 +61,35 @@ para futuros estudantes, com base em técnicas reais de estudo, ferramentas e es
 
 **Extraia exatamente 10 técnicas ou práticas de estudo que aparecem com maior frequência.**
 
-**Dados:** 
-{posts_text}
+**Dados** (anotações extraídas dos relatos, lote a lote):
+{notes_text}
 """
 
     # Prompt final concatenando o "system prompt" e o "user prompt"
-    final_prompt = system_prompt + user_prompt
-
-    try:
-        response = ollama.generate(
-            model="deepseek-r1",
-            prompt=final_prompt
-        )
-        return response["response"]
-    except Exception as e:
-        logging.error(f"Erro ao gerar resposta com Ollama: {e}")
-        return "Erro ao gerar resposta com Ollama."
-
-def remove_think_blocks(text):
-    """
-    Remove todo conteúdo que estiver entre <think>...</think>, incluindo as tags.
-    """
-    return re.sub(r"<think>.*?</think>", "", text, flags=re.DOTALL)
-
-def translate_to_portuguese(text):
-    """
-    Traduz o texto para Português usando deep-translator.
-    """
-    translator = GoogleTranslator(source='auto', target='pt')
-    return translator.translate(text)
+    return system_prompt + user_prompt
+
+OSCP_EXAM = {
+    "name": "oscp",
+    "subreddit": "oscp",
+    # Query de busca conforme o código original ("passed")
+    "search_query": "passed",
+    "keywords": USEFUL_KEYWORDS,
+    "min_length": MIN_SELFTEXT_LENGTH,
+    # Intervalo de datas (2023 e 2024)
+    "start_date": "2023-01-01",
+    "end_date": "2024-12-31",
+    "include_comments": True,
+    # Só as respostas diretas mais votadas de cada relato vão para o prompt (e são baixadas)
+    "top_comments": TOP_COMMENTS,
+    "extraction_prompt": build_oscp_extraction_prompt,
+    "report_prompt": build_oscp_report_prompt,
+    "db_file": "oscp_posts.db",
+    "output_file": "oscp_success_analysis.txt",
+    "model": "deepseek-r1",
+}
 
 def main():
-    setup_logging()
-    
-    # Carrega as credenciais do Reddit
-    CLIENT_ID, CLIENT_SECRET, USER_AGENT = load_api_keys()
-    reddit = initialize_reddit(CLIENT_ID, CLIENT_SECRET, USER_AGENT)
-    subreddit = reddit.subreddit("oscp")
-
-    # Define o intervalo de datas (2023 e 2024)
-    start_date = datetime(2023, 1, 1, tzinfo=timezone.utc).timestamp()
-    end_date = datetime(2024, 12, 31, 23, 59, 59, tzinfo=timezone.utc).timestamp()
-
-    # Define a query de busca conforme o código original ("passed")
-    search_query = "passed"
-
-    logging.info("Coletando posts...")
-    posts = collect_posts(subreddit, search_query, start_date, end_date)
-    logging.info(f"Coletados {len(posts)} posts úteis.")
-
-    # Configura o banco de dados SQLite e salva posts e comentários
-    conn = setup_database("oscp_posts.db")
-    logging.info("Salvando posts e comentários no banco de dados SQLite...")
-    save_posts_to_db(conn, posts)
-    logging.info("Dados salvos no banco de dados SQLite.")
-
-    # Preparar o texto para a análise (incluindo posts e comentários)
-    post_texts = []
-    for post in posts:
-        post_info = f"Title: {post.title}\nBody: {post.selftext}\nURL: {post.url}\n"
-        post_texts.append(post_info)
-        try:
-            post.comments.replace_more(limit=0)
-            for comment in post.comments.list():
-                comment_info = f"Reply: {comment.body}\n\n"
-                post_texts.append(comment_info)
-        except Exception as e:
-            logging.error(f"Erro ao coletar comentários do post {post.id}: {e}")
-
-    # Limitamos a string a ~25000 caracteres, caso seja muito grande
-    full_text = "\n".join(post_texts)[:25000]
-
-    logging.info("Analisando posts com IA (Ollama)...")
-    oscp_analysis = analyze_oscp_success(full_text)
-
-    # Remove possíveis blocos <think>...</think> da resposta
-    oscp_analysis = remove_think_blocks(oscp_analysis)
-
-    # Se quiser garantir a tradução final para português,
-    # caso a resposta ainda esteja em inglês ou misturada:
-    oscp_analysis = translate_to_portuguese(oscp_analysis)
-
-    # Salva os resultados da análise em um arquivo de texto
-    ai_output_file = "oscp_success_analysis.txt"
-    with open(ai_output_file, "w", encoding="utf-8") as f:
-        f.write(oscp_analysis)
-
-    logging.info(f"Análise de IA concluída. Confira '{ai_output_file}' para os resultados.")
+    run_single_exam(OSCP_EXAM, "Coleta e analisa histórias de sucesso do OSCP.")
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,186 @@
+import json
+import math
+import heapq
+import logging
+
+from insightsStore import NON_REDUNDANT_COMMENT, format_post_document, keywords_to_match, post_filter_sql
+from llmAnalysis import CHARS_PER_TOKEN
+
+# Peso de cada sinal no valor de um post ou comentário (cada sinal é normalizado para 0..1).
+RANKING_WEIGHTS = {
+    "relevance": 0.6,  # BM25 das palavras-chave do exame, ponderado por palavra
+    "length": 0.25,    # relatos mais longos tendem a ser mais detalhados
+    "score": 0.15,     # pontuação no Reddit
+}
+
+# Caracteres fixos que format_post_document acrescenta a cada post e a cada resposta.
+POST_OVERHEAD_CHARS = len("Title: \nBody: \nURL: \n")
+REPLY_OVERHEAD_CHARS = len("\nReply: \n\n")
+
+def keyword_weights(keywords):
+    """
+    Normaliza as palavras-chave de ranking: lista (peso 1) ou dicionário {palavra: peso}.
+    """
+    if not keywords:
+        return {}
+    if isinstance(keywords, dict):
+        return dict(keywords)
+    return {keyword: 1.0 for keyword in keywords}
+
+def fts_relevance(conn, fts_table, weights):
+    """
+    Soma, por rowid, o BM25 de cada palavra-chave multiplicado pelo seu peso. Usa as
+    estatísticas de termos que o FTS5 mantém no próprio banco (frequência por documento,
+    tamanho médio), sem reler o corpus.
+    """
+    relevance = {}
+    for keyword, weight in weights.items():
+        # bm25() do FTS5 é negativo: quanto menor, mais relevante.
+        for rowid, rank in conn.execute(
+            f"SELECT rowid, bm25({fts_table}) FROM {fts_table} WHERE {fts_table} MATCH ?",
+            (keywords_to_match([keyword]),)
+        ):
+            relevance[rowid] = relevance.get(rowid, 0.0) - weight * rank
+    return relevance
+
+def combine_signals(items):
+    """
+    Calcula o valor de cada item a partir de (relevância, tamanho, score), normalizando cada
+    sinal pelo maior valor do conjunto. items é uma lista de dicionários; o valor vai em "value".
+    """
+    signals = {
+        "relevance": [item["relevance"] for item in items],
+        "length": [math.log1p(item["chars"]) for item in items],
+        "score": [math.log1p(max(item["score"] or 0, 0)) for item in items],
+    }
+    maxima = {name: max(values, default=0) or 1 for name, values in signals.items()}
+    for i, item in enumerate(items):
+        item["value"] = sum(
+            RANKING_WEIGHTS[name] * signals[name][i] / maxima[name] for name in RANKING_WEIGHTS
+        )
+    return items
+
+def rank_posts(conn, weights, start_date=None, end_date=None, min_length=None, limit=None, match=None,
+               skip_redundant=False):
+    """
+    Pontua os posts que passam pelos filtros do exame. Só metadados são lidos (sem o texto).
+    """
+    filters, params = post_filter_sql(match, start_date, end_date, min_length, skip_redundant)
+    sql = f'''
+        SELECT p.rowid, p.id, p.created_utc, length(p.title) + length(p.selftext) + length(p.url), p.score
+        {filters} ORDER BY p.created_utc DESC
+    '''
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    relevance = fts_relevance(conn, "posts_fts", weights)
+    posts = [
+        {"id": post_id, "created_utc": created_utc, "chars": chars or 0, "score": score,
+         "relevance": relevance.get(rowid, 0.0)}
+        for rowid, post_id, created_utc, chars, score in conn.execute(sql, params)
+    ]
+    return combine_signals(posts)
+
+def rank_comments(conn, weights, post_ids, skip_redundant=False, top_comments=None):
+    """
+    Pontua os comentários dos posts informados. Retorna {post_id: [comentário, ...]}.
+    Com top_comments, só as N respostas diretas de maior pontuação de cada post concorrem, como
+    em load_comment_bodies (posts sem profundidade registrada mantêm todos os comentários).
+    """
+    relevance = fts_relevance(conn, "comments_fts", weights)
+    useful = NON_REDUNDANT_COMMENT if skip_redundant else "1"
+    rows_by_post = {}
+    # O filtro por post vai para o SQLite (índice de post_id) em vez de varrer a tabela inteira.
+    for row in conn.execute(f'''
+        SELECT rowid, id, post_id, created_utc, length(comment_body), score, depth, {useful} FROM comments
+        WHERE post_id IN (SELECT value FROM json_each(?))
+    ''', (json.dumps(list(post_ids)),)):
+        rows_by_post.setdefault(row[2], []).append(row)
+    comments = []
+    for rows in rows_by_post.values():
+        has_depth = any(row[6] is not None for row in rows)
+        rows = [row for row in rows if row[7]]
+        if top_comments is not None and has_depth:
+            # Mesma ordem de load_comment_bodies: score decrescente (nulos por último), depois rowid.
+            rows = sorted(
+                (row for row in rows if row[6] == 0), key=lambda row: (row[5] is None, -(row[5] or 0), row[0])
+            )[:top_comments]
+        comments.extend(
+            {"id": comment_id, "post_id": post_id, "created_utc": created_utc, "chars": chars or 0,
+             "score": score, "relevance": relevance.get(rowid, 0.0)}
+            for rowid, comment_id, post_id, created_utc, chars, score, _, _ in rows
+        )
+    by_post = {}
+    for comment in combine_signals(comments):
+        by_post.setdefault(comment["post_id"], []).append(comment)
+    return by_post
+
+def pack_items(posts, comments_by_post, token_budget):
+    """
+    Seleciona os itens de maior valor que cabem em token_budget. Um comentário só entra depois
+    do seu post (o contexto da resposta); itens que não cabem são pulados em favor dos menores.
+    Retorna (posts selecionados, {post_id: comentários selecionados}, tokens usados).
+    """
+    heap = [(-post["value"], i, "post", post) for i, post in enumerate(posts)]
+    heapq.heapify(heap)
+    sequence = len(heap)
+    selected_posts = []
+    selected_comments = {}
+    used = 0
+    while heap and used < token_budget:
+        _, _, kind, item = heapq.heappop(heap)
+        overhead = POST_OVERHEAD_CHARS if kind == "post" else REPLY_OVERHEAD_CHARS
+        cost = (item["chars"] + overhead) // CHARS_PER_TOKEN + 1
+        if used + cost > token_budget:
+            continue
+        used += cost
+        if kind == "post":
+            selected_posts.append(item)
+            for comment in comments_by_post.get(item["id"], []):
+                sequence += 1
+                heapq.heappush(heap, (-comment["value"], sequence, "comment", comment))
+        else:
+            selected_comments.setdefault(item["post_id"], []).append(item)
+    return selected_posts, selected_comments, used
+
+def load_selected_documents(conn, selected_posts, selected_comments):
+    """
+    Lê o texto dos itens selecionados e monta os documentos, do post mais antigo para o mais novo
+    (e os comentários em ordem cronológica), para que o cache de lotes continue estável.
+    """
+    documents = []
+    for post in sorted(selected_posts, key=lambda post: post["created_utc"]):
+        title, selftext, url = conn.execute(
+            "SELECT title, selftext, url FROM posts WHERE id = ?", (post["id"],)
+        ).fetchone()
+        comment_bodies = [
+            conn.execute("SELECT comment_body FROM comments WHERE id = ?", (comment["id"],)).fetchone()[0]
+            for comment in sorted(selected_comments.get(post["id"], []), key=lambda c: c["created_utc"] or 0)
+        ]
+        documents.append(format_post_document(title, selftext, url, comment_bodies))
+    return documents
+
+def select_ranked_documents(conn, token_budget, keywords=None, start_date=None, end_date=None,
+                            min_length=None, limit=None, match=None, include_comments=True,
+                            skip_redundant=False, top_comments=None):
+    """
+    Ranqueia os posts (e seus comentários) armazenados e devolve os documentos de maior valor
+    que cabem em token_budget, em vez de enviar tudo (ou truncar) na ordem da listagem.
+    Com skip_redundant, quase-duplicatas e respostas sem conteúdo não concorrem ao orçamento; com
+    top_comments, só as N respostas diretas de maior pontuação de cada post.
+    """
+    weights = keyword_weights(keywords)
+    posts = rank_posts(conn, weights, start_date, end_date, min_length, limit, match, skip_redundant)
+    comments_by_post = {}
+    if include_comments:
+        comments_by_post = rank_comments(
+            conn, weights, {post["id"] for post in posts}, skip_redundant, top_comments
+        )
+    selected_posts, selected_comments, used = pack_items(posts, comments_by_post, token_budget)
+    total_comments = sum(len(comments) for comments in comments_by_post.values())
+    logging.info(
+        f"Seleção por relevância: {len(selected_posts)} de {len(posts)} posts e "
+        f"{sum(len(c) for c in selected_comments.values())} de {total_comments} comentários "
+        f"(~{used} de {token_budget} tokens)."
+    )
+    return load_selected_documents(conn, selected_posts, selected_comments)
@@ -0,0 +1,282 @@
+import logging
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Itens por página nas listagens do Reddit (cada página é uma requisição).
+LISTING_PAGE_SIZE = 100
+
+# Registro compacto de um post: só os campos usados pelo pipeline, sem o objeto PRAW (que guarda
+# a resposta inteira da API e, depois de baixada, a árvore de comentários).
+PostRecord = namedtuple(
+    "PostRecord", ["id", "title", "selftext", "url", "created_utc", "num_comments", "score"]
+)
+
+def post_record(post):
+    """
+    Converte um Submission do PRAW em PostRecord.
+    """
+    return PostRecord(
+        post.id, post.title, post.selftext, post.url, post.created_utc,
+        getattr(post, "num_comments", None), getattr(post, "score", None)
+    )
+
+class PostListing:
+    """
+    Percorre a busca do subreddit do mais novo para o mais antigo, entregando um PostRecord por
+    vez (nada é acumulado). Os parâmetros são os de collect_posts. Depois da iteração, newest é o
+    post mais novo visto na listagem (ou None), usado como cursor da próxima coleta incremental.
+    """
+
+    def __init__(self, subreddit, search_query, start_date=None, end_date=None, limit=None,
+                 post_filter=None, since_utc=None, metrics=None):
+        self.subreddit = subreddit
+        self.search_query = search_query
+        self.start_date = start_date
+        self.end_date = end_date
+        self.limit = limit
+        self.post_filter = post_filter
+        self.since_utc = since_utc
+        self.metrics = metrics
+        self.newest = None
+
+    def __iter__(self):
+        listing = self.subreddit.search(self.search_query, sort="new", time_filter="all", limit=self.limit)
+        for seen, post in enumerate(listing):
+            if self.metrics is not None and seen % LISTING_PAGE_SIZE == 0:
+                self.metrics.count("reddit_listing_requests")
+            post = post_record(post)
+            if self.newest is None or post.created_utc > self.newest.created_utc:
+                self.newest = post
+            if self.since_utc is not None and post.created_utc <= self.since_utc:
+                logging.info(f"Alcançado o cursor da última coleta no post {post.id}; parando.")
+                break
+            if self.start_date is not None and post.created_utc < self.start_date:
+                logging.info(f"Alcançado o início do intervalo de datas no post {post.id}; parando.")
+                break
+            if self.end_date is not None and post.created_utc > self.end_date:
+                continue
+            if self.post_filter is None or self.post_filter(post):
+                yield post
+
+def crawl_cursor(newest, failed_posts):
+    """
+    Decide o cursor da próxima coleta incremental: o post mais novo da listagem (newest) ou, se
+    a árvore de comentários de algum post falhou, um ponto logo antes do mais antigo deles, para
+    que a próxima coleta volte a listá-lo (os posts já completos são pulados por
+    posts_needing_comments). Retorna (created_utc, id, rewind) ou None se nada foi listado;
+    rewind indica que o cursor pode retroceder.
+    """
+    if failed_posts:
+        # created_utc do Reddit tem resolução de 1s: um segundo antes inclui o post na listagem.
+        oldest = min(failed_posts, key=lambda post: post.created_utc)
+        return oldest.created_utc - 1, oldest.id, True
+    if newest is None:
+        return None
+    return newest.created_utc, newest.id, False
+
+def collect_posts(subreddit, search_query, start_date=None, end_date=None, limit=None,
+                  post_filter=None, since_utc=None, metrics=None):
+    """
+    Coleta posts do subreddit com base em um termo de busca, do mais novo para o mais antigo.
+    - start_date/end_date restringem o intervalo de datas (timestamps UTC).
+    - post_filter é uma função opcional que decide se o post é útil.
+    - since_utc é o cursor da coleta anterior: ao alcançá-lo, a paginação para.
+    - metrics (RunMetrics) recebe o número de páginas de listagem requisitadas.
+
+    Como a listagem sort="new" é decrescente, a paginação também para ao passar de start_date.
+    Retorna (posts, newest), onde newest é o post mais novo visto na listagem (ou None).
+    Para não manter todos os posts em memória, itere um PostListing diretamente.
+    """
+    listing = PostListing(subreddit, search_query, start_date, end_date, limit, post_filter, since_utc, metrics)
+    posts = list(listing)
+    return posts, listing.newest
+
+# Registro compacto de um comentário, desacoplado dos objetos PRAW. parent_id é o fullname do pai
+# ("t3_<post>" para respostas diretas ao post, "t1_<comentário>" nas demais) e depth, a profundidade
+# na árvore (0 = resposta direta ao post).
+CommentRecord = namedtuple(
+    "CommentRecord",
+    ["id", "post_id", "body", "created_utc", "score", "parent_id", "depth", "author_flair"],
+    defaults=(None, None, None, None)
+)
+
+def comment_record(comment, post_id):
+    """
+    Converte um Comment do PRAW em CommentRecord.
+    """
+    return CommentRecord(
+        comment.id, post_id, comment.body, getattr(comment, 'created_utc', None),
+        getattr(comment, 'score', None), getattr(comment, 'parent_id', None),
+        getattr(comment, 'depth', None), getattr(comment, 'author_flair_text', None)
+    )
+
+def is_more_comments(item):
+    # MoreComments (o "carregar mais" do Reddit) não tem corpo.
+    return not hasattr(item, "body")
+
+def top_level_comments(submission, top_comments, budget=None, metrics=None):
+    """
+    Coleta as top_comments respostas diretas ao post de maior pontuação. Com a ordenação "top",
+    a primeira página já traz as melhores; só os MoreComments do primeiro nível são expandidos, e
+    apenas enquanto faltarem respostas. Respostas mais profundas já presentes na página também
+    são mantidas (sem expandir os seus MoreComments).
+    """
+    loaded = []
+    pending_more = []
+    for item in submission.comments:
+        (pending_more if is_more_comments(item) else loaded).append(item)
+    while pending_more and len(loaded) < top_comments:
+        more = pending_more.pop(0)
+        if budget is not None:
+            budget.acquire()
+        if metrics is not None:
+            metrics.count("reddit_more_comments_requests")
+        for item in more.comments():
+            if is_more_comments(item):
+                pending_more.append(item)
+            elif getattr(item, "parent_id", None) == f"t3_{submission.id}":
+                loaded.append(item)
+    loaded.sort(key=lambda comment: getattr(comment, "score", 0) or 0, reverse=True)
+    comments = []
+    for comment in loaded[:top_comments]:
+        comments.append(comment)
+        replies = getattr(comment, "replies", None)
+        if replies is not None:
+            comments.extend(reply for reply in replies.list() if not is_more_comments(reply))
+    return comments
+
+class RateLimitBudget:
+    """
+    Orçamento de requisições compartilhado entre as threads de coleta.
+    Usa os cabeçalhos de rate limit do Reddit (expostos em reddit.auth.limits) e, quando o
+    saldo restante chega à reserva, bloqueia todas as threads até a janela ser renovada.
+    """
+
+    def __init__(self, reserve=10):
+        self.reserve = reserve
+        self.remaining = None
+        self.reset_timestamp = None
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Reserva uma requisição, aguardando a renovação da janela se o saldo estiver esgotado.
+        """
+        with self._lock:
+            if self.remaining is not None and self.remaining <= self.reserve:
+                wait = (self.reset_timestamp or 0) - time.time()
+                if wait > 0:
+                    logging.info(f"Limite de requisições do Reddit quase esgotado; aguardando {wait:.0f}s.")
+                    time.sleep(wait)
+                self.remaining = None
+            if self.remaining is not None:
+                self.remaining -= 1
+            self.requests += 1
+
+    def update(self, limits):
+        """
+        Atualiza o saldo com os valores mais recentes informados pelo Reddit.
+        """
+        remaining = limits.get("remaining")
+        if remaining is None:
+            return
+        with self._lock:
+            reset_timestamp = limits.get("reset_timestamp")
+            same_window = (
+                self.reset_timestamp is not None and reset_timestamp is not None
+                and abs(reset_timestamp - self.reset_timestamp) < 5
+            )
+            # Respostas podem chegar fora de ordem: mantém o menor saldo da janela atual.
+            if self.remaining is None or not same_window or remaining < self.remaining:
+                self.remaining = remaining
+                self.reset_timestamp = reset_timestamp
+
+class CommentFetcher:
+    """
+    Threads de coleta de comentários, cada uma com o seu cliente PRAW (PRAW não é thread-safe).
+    Threads e clientes são criados uma vez e reutilizados em todos os lotes (e exames), em vez de
+    um novo praw.Reddit, com novo token OAuth, por thread a cada lote.
+    """
+
+    def __init__(self, reddit_factory, max_workers=8):
+        self.reddit_factory = reddit_factory
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="reddit")
+        self.local = threading.local()
+
+    def client(self):
+        """
+        Cliente PRAW da thread atual, criado na primeira chamada.
+        """
+        if not hasattr(self.local, "reddit"):
+            self.local.reddit = self.reddit_factory()
+        return self.local.reddit
+
+    def close(self):
+        self.executor.shutdown()
+
+def fetch_comment_forests(reddit_factory, posts, max_workers=8, budget=None, on_forest=None,
+                          metrics=None, keep=True, top_comments=None, fetcher=None):
+    """
+    Baixa em paralelo as árvores de comentários dos posts, uma única vez por post.
+    - reddit_factory cria uma instância de praw.Reddit por thread (PRAW não é thread-safe).
+    - budget é um RateLimitBudget compartilhado; um novo é criado se não for informado.
+    - on_forest(post, records) é chamado na thread principal assim que cada árvore chega
+      (ex.: BulkWriter.add_forest), permitindo gravar enquanto as demais são baixadas.
+    - metrics (RunMetrics) recebe as requisições feitas e o saldo restante do rate limit.
+    - top_comments limita a coleta às N respostas diretas de maior pontuação de cada post (ver
+      top_level_comments); sem ele, toda a árvore carregada na primeira página é mantida.
+    - fetcher é um CommentFetcher reutilizado entre chamadas (reddit_factory e max_workers são
+      então ignorados); sem ele, threads e clientes são criados só para esta chamada.
+
+    Retorna {post_id: [CommentRecord, ...]}; posts cuja coleta falhou ficam de fora.
+    Com keep=False (processamento em fluxo via on_forest), as árvores não são guardadas e o
+    retorno é {post_id: número de comentários}.
+    """
+    budget = budget or RateLimitBudget()
+    own_fetcher = fetcher is None
+    if own_fetcher:
+        fetcher = CommentFetcher(reddit_factory, max_workers)
+
+    def fetch(post_id):
+        reddit = fetcher.client()
+        budget.acquire()
+        if metrics is not None:
+            metrics.count("reddit_comment_requests")
+        submission = reddit.submission(id=post_id)
+        if top_comments is not None:
+            submission.comment_sort = "top"
+            comments = top_level_comments(submission, top_comments, budget, metrics)
+        else:
+            submission.comments.replace_more(limit=0)
+            comments = submission.comments.list()
+        records = [comment_record(comment, post_id) for comment in comments]
+        budget.update(reddit.auth.limits)
+        return records
+
+    forests = {}
+    try:
+        futures = {fetcher.executor.submit(fetch, post.id): post for post in posts}
+        requested = len(futures)
+        for future in as_completed(futures):
+            # Libera cada árvore assim que ela é entregue.
+            post = futures.pop(future)
+            try:
+                records = future.result()
+            except Exception as e:
+                logging.error(f"Erro ao processar comentários do post {post.id}: {e}")
+                continue
+            forests[post.id] = records if keep else len(records)
+            if on_forest is not None:
+                on_forest(post, records)
+    finally:
+        if own_fetcher:
+            fetcher.close()
+    if metrics is not None:
+        metrics.gauge("reddit_remaining", budget.remaining)
+        metrics.gauge("reddit_reset_timestamp", budget.reset_timestamp)
+    logging.info(f"Árvores de comentários baixadas: {len(forests)} de {requested} "
+                 f"({budget.requests} requisições, saldo restante {budget.remaining}).")
+    return forests
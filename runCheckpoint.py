@@ -0,0 +1,218 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+# Situação de uma execução na tabela runs.
+RUN_IN_PROGRESS = "em andamento"
+RUN_FINISHED = "concluída"
+
+def setup_checkpoint_tables(conn):
+    """
+    Cria (se necessário) as tabelas de checkpoints das execuções:
+    - runs: uma linha por execução (run_id) e exame, com as opções e a situação;
+    - run_stages: etapas concluídas, com o resultado da etapa (payload em texto);
+    - run_posts: ids dos posts coletados e já gravados na execução;
+    - run_chunks: lotes montados para o modelo e a extração de cada um.
+    """
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS runs (
+            run_id TEXT,
+            exam TEXT,
+            status TEXT,
+            options TEXT,
+            started_at REAL,
+            updated_at REAL,
+            PRIMARY KEY (run_id, exam)
+        );
+        CREATE TABLE IF NOT EXISTS run_stages (
+            run_id TEXT,
+            exam TEXT,
+            stage TEXT,
+            payload TEXT,
+            completed_at REAL,
+            PRIMARY KEY (run_id, exam, stage)
+        );
+        CREATE TABLE IF NOT EXISTS run_posts (
+            run_id TEXT,
+            exam TEXT,
+            post_id TEXT,
+            PRIMARY KEY (run_id, exam, post_id)
+        );
+        CREATE TABLE IF NOT EXISTS run_chunks (
+            run_id TEXT,
+            exam TEXT,
+            step TEXT,
+            seq INTEGER,
+            chunk TEXT,
+            output TEXT,
+            PRIMARY KEY (run_id, exam, step, seq)
+        );
+    ''')
+    conn.commit()
+
+def latest_unfinished_run(db_file, exam):
+    """
+    Retorna o run_id da execução mais recente do exame que não foi concluída, ou None.
+    """
+    conn = sqlite3.connect(db_file)
+    try:
+        setup_checkpoint_tables(conn)
+        row = conn.execute('''
+            SELECT run_id FROM runs WHERE exam = ? AND status != ?
+            ORDER BY started_at DESC LIMIT 1
+        ''', (exam, RUN_FINISHED)).fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+def save_run_posts(conn, run_id, exam, post_ids):
+    """
+    Registra posts já gravados na execução. Recebe a conexão de quem gravou as linhas (a thread
+    de escrita), para que o checkpoint só exista depois dos próprios posts.
+    """
+    with conn:
+        conn.executemany(
+            "INSERT OR IGNORE INTO run_posts (run_id, exam, post_id) VALUES (?, ?, ?)",
+            [(run_id, exam, post_id) for post_id in post_ids]
+        )
+
+class RunCheckpoint:
+    """
+    Checkpoints de uma execução de um exame, gravados no banco do exame sob o run_id.
+    Cada etapa concluída (coleta, deduplicação, análise, tradução) e cada lote extraído pelo
+    modelo ficam registrados; ao retomar a execução (--resume), o que já foi feito é pulado.
+    Pode ser usado por várias threads.
+    """
+
+    def __init__(self, db_file, run_id, exam):
+        self.run_id = run_id
+        self.exam = exam
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        setup_checkpoint_tables(self.conn)
+
+    def start(self, options=None, resume=False):
+        """
+        Registra o início (ou, com resume, a retomada) da execução. Retorna True se ela já existia.
+        Sem resume, um run_id já usado no exame é recusado (ValueError), para que as etapas de
+        outra execução não sejam reaproveitadas com opções diferentes.
+        """
+        now = time.time()
+        with self._lock:
+            resumed = self.conn.execute(
+                "SELECT 1 FROM runs WHERE run_id = ? AND exam = ?", (self.run_id, self.exam)
+            ).fetchone() is not None
+            if resumed and not resume:
+                raise ValueError(
+                    f"A execução {self.run_id} já existe para o exame {self.exam}; use --resume {self.run_id} "
+                    "para retomá-la ou informe outro --run-id."
+                )
+            self.conn.execute('''
+                INSERT INTO runs (run_id, exam, status, options, started_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (run_id, exam) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at
+            ''', (self.run_id, self.exam, RUN_IN_PROGRESS, json.dumps(options or {}), now, now))
+            self.conn.commit()
+        return resumed
+
+    def stage(self, stage):
+        """
+        Retorna o payload da etapa, se ela já foi concluída nesta execução, ou None.
+        Etapas sem resultado têm payload "".
+        """
+        with self._lock:
+            row = self.conn.execute('''
+                SELECT payload FROM run_stages WHERE run_id = ? AND exam = ? AND stage = ?
+            ''', (self.run_id, self.exam, stage)).fetchone()
+        return row[0] if row else None
+
+    def complete(self, stage, payload=""):
+        """
+        Marca a etapa como concluída, guardando o seu resultado.
+        """
+        now = time.time()
+        with self._lock:
+            self.conn.execute('''
+                INSERT OR REPLACE INTO run_stages (run_id, exam, stage, payload, completed_at)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (self.run_id, self.exam, stage, payload, now))
+            self.conn.execute(
+                "UPDATE runs SET updated_at = ? WHERE run_id = ? AND exam = ?", (now, self.run_id, self.exam)
+            )
+            self.conn.commit()
+
+    def post_ids(self):
+        """
+        Retorna os ids dos posts coletados na execução.
+        """
+        with self._lock:
+            return [row[0] for row in self.conn.execute(
+                "SELECT post_id FROM run_posts WHERE run_id = ? AND exam = ?", (self.run_id, self.exam)
+            )]
+
+    def save_chunk(self, step, seq, chunk):
+        """
+        Registra o lote seq da etapa step (ex.: "map1") e retorna a extração já gerada para ele
+        em uma tentativa anterior, ou None. Se o lote mudou, a extração antiga é descartada.
+        """
+        with self._lock:
+            row = self.conn.execute('''
+                SELECT chunk, output FROM run_chunks WHERE run_id = ? AND exam = ? AND step = ? AND seq = ?
+            ''', (self.run_id, self.exam, step, seq)).fetchone()
+            if row is not None and row[0] == chunk:
+                return row[1]
+            self.conn.execute('''
+                INSERT OR REPLACE INTO run_chunks (run_id, exam, step, seq, chunk, output)
+                VALUES (?, ?, ?, ?, ?, NULL)
+            ''', (self.run_id, self.exam, step, seq, chunk))
+            self.conn.commit()
+        return None
+
+    def save_output(self, step, seq, output):
+        """
+        Guarda a extração gerada para o lote seq da etapa step.
+        """
+        with self._lock:
+            self.conn.execute('''
+                UPDATE run_chunks SET output = ? WHERE run_id = ? AND exam = ? AND step = ? AND seq = ?
+            ''', (output, self.run_id, self.exam, step, seq))
+            self.conn.commit()
+
+    def iter_chunks(self, step):
+        """
+        Se todos os lotes da etapa step já foram montados, gera (seq, lote, extração ou None),
+        lendo um lote por vez; caso contrário, retorna None.
+        """
+        count = self.stage(f"chunks:{step}")
+        if count is None:
+            return None
+
+        def rows():
+            for seq in range(int(count)):
+                with self._lock:
+                    chunk, output = self.conn.execute('''
+                        SELECT chunk, output FROM run_chunks
+                        WHERE run_id = ? AND exam = ? AND step = ? AND seq = ?
+                    ''', (self.run_id, self.exam, step, seq)).fetchone()
+                yield seq, chunk, output
+        return rows()
+
+    def finish(self):
+        """
+        Marca a execução como concluída e descarta os lotes, que não serão mais retomados.
+        """
+        with self._lock:
+            self.conn.execute(
+                "DELETE FROM run_chunks WHERE run_id = ? AND exam = ?", (self.run_id, self.exam)
+            )
+            self.conn.execute(
+                "UPDATE runs SET status = ?, updated_at = ? WHERE run_id = ? AND exam = ?",
+                (RUN_FINISHED, time.time(), self.run_id, self.exam)
+            )
+            self.conn.commit()
+        logging.info(f"Execução {self.run_id} concluída.")
+
+    def close(self):
+        self.conn.close()
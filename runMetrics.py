@@ -0,0 +1,155 @@
+import os
+import sys
+import json
+import time
+import cProfile
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Campos de desempenho devolvidos pelo Ollama em cada geração (durações em nanossegundos).
+OLLAMA_FIELDS = ("prompt_eval_count", "prompt_eval_duration", "eval_count", "eval_duration", "total_duration")
+
+def peak_rss_mb():
+    """
+    Retorna o pico de memória residente do processo até agora, em MB (None se indisponível).
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB; macOS, em bytes.
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+class RunMetrics:
+    """
+    Métricas de uma execução: tempo de parede por etapa, contadores (requisições ao Reddit,
+    linhas gravadas...), valores instantâneos (saldo de rate limit), estatísticas de geração do
+    Ollama e pico de memória. Pode ser usado por várias threads; é gravado em JSON ao final.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.started_at = datetime.now(timezone.utc)
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self.stages = {}
+        self.counters = {}
+        self.gauges = {}
+        self.ollama = dict.fromkeys(OLLAMA_FIELDS, 0)
+        self.ollama["calls"] = 0
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Mede o tempo de parede de um bloco como a etapa name (somado se a etapa se repetir).
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name, seconds):
+        with self._lock:
+            stage = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0})
+            stage["seconds"] += seconds
+            stage["calls"] += 1
+            stage["peak_rss_mb"] = peak_rss_mb()
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name, value):
+        with self._lock:
+            self.gauges[name] = value
+
+    def record_generation(self, response):
+        """
+        Soma as estatísticas de uma resposta do Ollama (a resposta completa ou o último pedaço
+        do stream, que traz os totais).
+        """
+        with self._lock:
+            self.ollama["calls"] += 1
+            for field in OLLAMA_FIELDS:
+                self.ollama[field] += response.get(field) or 0
+
+    def summary(self):
+        """
+        Retorna as métricas como um dicionário serializável em JSON.
+        """
+        with self._lock:
+            ollama = dict(self.ollama)
+            eval_seconds = ollama["eval_duration"] / 1e9
+            prompt_seconds = ollama["prompt_eval_duration"] / 1e9
+            ollama["tokens_per_second"] = round(ollama["eval_count"] / eval_seconds, 2) if eval_seconds else None
+            ollama["prompt_tokens_per_second"] = (
+                round(ollama["prompt_eval_count"] / prompt_seconds, 2) if prompt_seconds else None
+            )
+            return {
+                "name": self.name,
+                "started_at": self.started_at.isoformat(),
+                "total_seconds": round(time.perf_counter() - self._start, 3),
+                "peak_rss_mb": peak_rss_mb(),
+                "stages": {
+                    name: {**stage, "seconds": round(stage["seconds"], 3)} for name, stage in self.stages.items()
+                },
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "ollama": ollama,
+            }
+
+    def file_path(self, directory, extension):
+        stamp = self.started_at.strftime("%Y%m%d-%H%M%S")
+        return os.path.join(directory, f"{self.name}_{stamp}.{extension}")
+
+    def write(self, directory, extra=None):
+        """
+        Grava as métricas em directory/<nome>_<AAAAMMDD-HHMMSS>.json e retorna o caminho.
+        """
+        os.makedirs(directory, exist_ok=True)
+        path = self.file_path(directory, "json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({**self.summary(), **(extra or {})}, f, indent=2, ensure_ascii=False)
+        logging.info(f"Métricas da execução gravadas em '{path}'.")
+        return path
+
+# Impede dois perfis simultâneos (um por exame, em threads diferentes).
+_profile_lock = threading.Lock()
+
+@contextmanager
+def profiled(metrics, directory):
+    """
+    Perfila (cProfile) a thread atual durante o bloco e grava o resultado ao lado das métricas,
+    em <nome>_<AAAAMMDD-HHMMSS>.prof (abra com `python -m pstats` ou snakeviz).
+    Só um perfil fica ativo por vez (a partir do Python 3.12 o cProfile não aceita dois
+    simultâneos): com exames em paralelo, o primeiro é perfilado e os demais rodam sem perfil.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        logging.warning("Outro exame já está sendo perfilado; este roda sem perfil.")
+        yield
+        return
+    try:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            logging.warning(f"Não foi possível ativar o cProfile ({e}); o exame roda sem perfil.")
+            yield
+            return
+        try:
+            yield
+        finally:
+            profiler.disable()
+            os.makedirs(directory, exist_ok=True)
+            path = metrics.file_path(directory, "prof")
+            profiler.dump_stats(path)
+            logging.info(f"Perfil de execução gravado em '{path}'.")
+    finally:
+        _profile_lock.release()
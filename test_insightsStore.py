@@ -0,0 +1,103 @@
+from insightsStore import BulkWriter, keywords_to_match, search_comments, search_posts, setup_database
+from redditCrawler import CommentRecord, PostRecord
+
+def post(post_id, selftext, created_utc=1, score=1, num_comments=0, title="OSCP"):
+    return PostRecord(post_id, title, selftext, "https://reddit.com", created_utc, num_comments, score)
+
+def write(conn, posts=(), forests=()):
+    writer = BulkWriter(conn)
+    for record in posts:
+        writer.add_post(record)
+    for record, comments in forests:
+        writer.add_forest(record, comments)
+    writer.close()
+    return writer
+
+def found(conn, keyword):
+    return [row[0] for row in search_posts(conn, keywords_to_match([keyword]))]
+
+def test_fulltext_follows_text_changes(tmp_path):
+    conn = setup_database(tmp_path / "posts.db")
+    write(conn, [post("a", "buffer overflow practice")])
+    assert found(conn, "overflow") == ["a"]
+    write(conn, [post("a", "active directory labs")])
+    assert found(conn, "overflow") == []
+    assert found(conn, "directory") == ["a"]
+
+def test_score_change_does_not_reindex(tmp_path):
+    conn = setup_database(tmp_path / "posts.db")
+    parent = post("a", "buffer overflow practice")
+    reply = CommentRecord("c1", "a", "enumerate every port", 2, 1, "t3_a", 0, None)
+    write(conn, [parent], [(parent, [reply])])
+    before = conn.total_changes
+    write(conn, [parent._replace(score=99)], [(parent, [reply._replace(score=7)])])
+    # Só as duas linhas (e o num_comments do post) mudam; nenhum trigger reescreve o FTS.
+    assert conn.total_changes - before == 3
+    assert found(conn, "overflow") == ["a"]
+    assert [row[0] for row in search_comments(conn, keywords_to_match(["port"]))] == ["c1"]
+
+def test_existing_database_triggers_are_migrated(tmp_path):
+    db_file = tmp_path / "posts.db"
+    conn = setup_database(db_file)
+    conn.executescript('''
+        DROP TRIGGER posts_fts_update;
+        CREATE TRIGGER posts_fts_update AFTER UPDATE OF title, selftext ON posts BEGIN
+            SELECT 1;
+        END;
+    ''')
+    conn.close()
+    conn = setup_database(db_file)
+    sql = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'posts_fts_update'").fetchone()[0]
+    assert "WHEN old.title IS NOT new.title" in sql
+
+def test_unchanged_rows_are_not_rewritten(tmp_path):
+    conn = setup_database(tmp_path / "posts.db")
+    write(conn, [post("a", "buffer overflow practice"), post("b", "active directory labs")])
+    before = conn.total_changes
+    write(conn, [post("a", "buffer overflow practice"), post("b", "active directory labs")])
+    assert conn.total_changes == before
+    write(conn, [post("a", "buffer overflow practice", score=5)])
+    assert conn.total_changes - before == 1
+    assert conn.execute("SELECT score FROM posts WHERE id = 'a'").fetchone()[0] == 5
+
+def test_invalid_rows_are_rejected(tmp_path):
+    conn = setup_database(tmp_path / "posts.db")
+    parent = post("a", "buffer overflow practice")
+    comments = [
+        CommentRecord("c1", "a", "enumerate every port", 2, 1),
+        CommentRecord("c2", "a", None, 2, 1),
+        CommentRecord(None, "a", "sem id", 2, 1),
+    ]
+    writer = write(conn, [parent, post("b", "sem data", created_utc=None)], [(parent, comments)])
+    assert [(kind, row_id) for kind, row_id, _ in writer.failures] == [
+        ("post", "b"), ("comentário", "c2"), ("comentário", None)
+    ]
+    assert writer.written == {"posts": 1, "comments": 1}
+    assert conn.execute("SELECT id FROM comments").fetchall() == [("c1",)]
+
+def test_num_comments_is_written_with_the_forest(tmp_path):
+    conn = setup_database(tmp_path / "posts.db")
+    parent = post("a", "buffer overflow practice", num_comments=1)
+    write(conn, [parent])
+    assert conn.execute("SELECT num_comments FROM posts").fetchone()[0] is None
+    write(conn, forests=[(parent, [CommentRecord("c1", "a", "enumerate every port", 2, 1)])])
+    assert conn.execute("SELECT num_comments FROM posts").fetchone()[0] == 1
+
+def test_comment_metadata_is_updated(tmp_path):
+    conn = setup_database(tmp_path / "posts.db")
+    parent = post("a", "buffer overflow practice")
+    reply = CommentRecord("c1", "a", "enumerate every port", 2, 1, "t3_a", 0, "OSCP")
+    write(conn, [parent], [(parent, [reply])])
+    write(conn, forests=[(parent, [reply._replace(parent_id="t1_c0", depth=1, author_flair="OSEP")])])
+    assert conn.execute(
+        "SELECT parent_id, depth, author_flair FROM comments WHERE id = 'c1'"
+    ).fetchone() == ("t1_c0", 1, "OSEP")
+
+def test_rows_are_flushed_in_batches(tmp_path):
+    conn = setup_database(tmp_path / "posts.db")
+    writer = BulkWriter(conn, batch_size=2)
+    for post_id in "abc":
+        writer.add_post(post(post_id, "buffer overflow practice"))
+    assert writer.written["posts"] == 2
+    writer.close()
+    assert conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0] == 3
@@ -0,0 +1,112 @@
+import pytest
+
+from llmAnalysis import (
+    CHARS_PER_TOKEN, GENERATION_ERROR, ThinkBlockFilter, iter_chunks, map_reduce_generate, remove_think_blocks,
+    split_oversized
+)
+
+DOCUMENTS = [
+    "post curto",
+    "outro post\n\ncom dois parágrafos",
+    "a" * 1000,
+    "parágrafo\n\n" * 80,
+    "b" * 40,
+]
+
+@pytest.mark.parametrize("max_tokens", [1, 10, 50, 400])
+def test_iter_chunks_respects_budget(max_tokens):
+    chunks = list(iter_chunks(DOCUMENTS, max_tokens))
+    assert chunks
+    for chunk in chunks:
+        # Sem as quebras de linha que juntam os pedaços, o lote cabe no orçamento em caracteres.
+        assert len(chunk.replace("\n", "")) <= max_tokens * CHARS_PER_TOKEN
+
+def test_iter_chunks_does_not_split_small_documents():
+    assert list(iter_chunks(["um", "dois", "três"], 1000)) == ["um\ndois\ntrês"]
+
+def test_split_oversized_keeps_all_text():
+    document = "parágrafo\n\n" * 50 + "c" * 500
+    pieces = split_oversized(document, 20)
+    assert all(len(piece) <= 20 * CHARS_PER_TOKEN for piece in pieces)
+    assert "".join(pieces).replace("\n", "") == document.replace("\n", "")
+
+@pytest.mark.parametrize("max_tokens", [0, -1, -4096])
+def test_iter_chunks_rejects_invalid_budget(max_tokens):
+    with pytest.raises(ValueError):
+        list(iter_chunks(["a" * 100], max_tokens))
+
+RESPONSES = [
+    "sem raciocínio",
+    "<think>plano</think>\n\nRelatório final",
+    "antes <think>a</think> meio <think>b\nc</think> depois",
+    "<think>resposta cortada no meio do raciocínio",
+    "texto <think>fechado</think> e <think>não fechado",
+    "menor < maior e <thinking> não é tag",
+    "",
+]
+
+def filter_stream(text, size):
+    """
+    Passa text pelo ThinkBlockFilter em pedaços de size caracteres, como chegam do streaming.
+    """
+    think_filter = ThinkBlockFilter()
+    output = [think_filter.feed(text[i:i + size]) for i in range(0, len(text), size)]
+    output.append(think_filter.flush())
+    return "".join(output)
+
+@pytest.mark.parametrize("text", RESPONSES)
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 1000])
+def test_think_filter_matches_remove_think_blocks(text, size):
+    # As tags chegam divididas entre pedaços em todos os tamanhos menores que elas.
+    assert filter_stream(text, size) == remove_think_blocks(text)
+
+def test_remove_think_blocks_drops_unclosed_block():
+    assert remove_think_blocks("resposta <think>cortada") == "resposta "
+
+class FakePool:
+    """
+    Substitui o OllamaPool: responde a cada prompt com um resumo curto e falha nos prompts que
+    contêm algum dos textos em failing.
+    """
+
+    def __init__(self, failing=(), response_chars=0):
+        self.failing = set(failing)
+        self.response_chars = response_chars
+        self.prompts = []
+        self.options = []
+
+    def generate(self, model, prompt, options=None, keep_alive=None):
+        self.prompts.append(prompt)
+        self.options.append(options)
+        if any(text in prompt for text in self.failing):
+            raise ConnectionError("Ollama fora do ar")
+        return {"response": f"<think>...</think>resumo {len(self.prompts)} " + "y" * self.response_chars}
+
+MAP_DOCUMENTS = [f"post {i} " + "x" * 450 for i in range(3)]
+
+def analyze(pool, checkpoint=None):
+    return map_reduce_generate(
+        MAP_DOCUMENTS, lambda chunk: f"EXTRAIR\n{chunk}", lambda notes: f"RELATÓRIO\n{notes}",
+        num_ctx=300, num_predict=100, max_workers=1, pool=pool, checkpoint=checkpoint
+    )
+
+def test_map_reduce_combines_every_chunk():
+    pool = FakePool()
+    assert analyze(pool).startswith("resumo")
+    assert sum(prompt.startswith("EXTRAIR") for prompt in pool.prompts) == 3
+    assert pool.prompts[-1].startswith("RELATÓRIO")
+
+def test_failed_chunk_aborts_analysis():
+    pool = FakePool(failing=["post 1 "])
+    assert analyze(pool) == GENERATION_ERROR
+    assert not any(prompt.startswith("RELATÓRIO") for prompt in pool.prompts)
+
+def test_map_outputs_are_capped_but_report_is_not():
+    pool = FakePool()
+    analyze(pool)
+    assert [options.get("num_predict") for options in pool.options] == [100, 100, 100, None]
+
+def test_non_shrinking_extractions_raise_instead_of_truncating():
+    # Um modelo que ignora o limite devolve extrações do tamanho de um lote inteiro.
+    with pytest.raises(ValueError):
+        analyze(FakePool(response_chars=500))
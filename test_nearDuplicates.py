@@ -0,0 +1,71 @@
+from insightsStore import BulkWriter, iter_post_documents, setup_database
+from nearDuplicates import SignatureIndex, simhash, update_signatures
+from redditCrawler import CommentRecord, PostRecord
+
+STORY = (
+    "Passed the OSCP on my second attempt after three months in the labs, "
+    "the key was enumeration, note taking and practicing buffer overflows every day"
+)
+
+def write(conn, posts, forests=()):
+    writer = BulkWriter(conn)
+    for post in posts:
+        writer.add_post(post)
+    for post, comments in forests:
+        writer.add_forest(post, comments)
+    writer.close()
+
+def post(post_id, text, created_utc, score=1):
+    return PostRecord(post_id, "OSCP", text, "https://reddit.com", created_utc, 0, score)
+
+def duplicates(conn, table="posts"):
+    return conn.execute(f"SELECT id, duplicate_of FROM {table} ORDER BY created_utc").fetchall()
+
+def test_copy_points_to_original(tmp_path):
+    conn = setup_database(tmp_path / "posts.db")
+    write(conn, [post("orig", STORY, 1), post("copy", STORY + "!", 2)])
+    update_signatures(conn)
+    assert duplicates(conn) == [("orig", None), ("copy", "orig")]
+
+def test_score_change_keeps_signatures(tmp_path):
+    conn = setup_database(tmp_path / "posts.db")
+    write(conn, [post("orig", STORY, 1), post("copy", STORY + "!", 2)])
+    update_signatures(conn)
+    write(conn, [post("orig", STORY, 1, score=50)])
+    assert conn.execute("SELECT COUNT(*) FROM posts WHERE simhash IS NULL").fetchone()[0] == 0
+    update_signatures(conn)
+    assert duplicates(conn) == [("orig", None), ("copy", "orig")]
+    assert len(list(iter_post_documents(conn, skip_redundant=True))) == 1
+
+def test_comment_score_change_keeps_signature(tmp_path):
+    conn = setup_database(tmp_path / "posts.db")
+    parent = post("p1", STORY, 1)
+    reply = CommentRecord("c1", "p1", STORY, 2, 1, "t3_p1", 0, None)
+    write(conn, [parent], [(parent, [reply])])
+    update_signatures(conn)
+    write(conn, [], [(parent, [reply._replace(score=10)])])
+    assert conn.execute("SELECT simhash IS NOT NULL, score FROM comments").fetchone() == (1, 10)
+
+def test_edited_original_is_not_duplicate_of_its_copy(tmp_path):
+    conn = setup_database(tmp_path / "posts.db")
+    write(conn, [post("orig", STORY, 1), post("copy", STORY + "!", 2)])
+    update_signatures(conn)
+    write(conn, [post("orig", STORY + ".", 1)])
+    update_signatures(conn)
+    assert duplicates(conn) == [("orig", None), ("copy", "orig")]
+
+def test_self_duplicates_are_repaired(tmp_path):
+    conn = setup_database(tmp_path / "posts.db")
+    write(conn, [post("orig", STORY, 1), post("copy", STORY + "!", 2)])
+    update_signatures(conn)
+    with conn:
+        conn.execute("UPDATE posts SET duplicate_of = 'orig' WHERE id = 'orig'")
+    update_signatures(conn)
+    assert duplicates(conn) == [("orig", None), ("copy", "orig")]
+
+def test_signature_index_skips_own_copies():
+    index = SignatureIndex()
+    signature = simhash(STORY)
+    index.add("copy", signature, "orig")
+    assert index.find(signature) == "orig"
+    assert index.find(signature, "orig") is None
@@ -0,0 +1,74 @@
+import sys
+import time
+import types
+
+import pytest
+
+import ollamaPool
+from ollamaPool import OllamaPool, OllamaUnavailable
+
+class ResponseError(Exception):
+    def __init__(self, error, status_code=-1):
+        super().__init__(error)
+        self.status_code = status_code
+
+class FakeClient:
+    """
+    Substitui o ollama.Client. Cada servidor falha enquanto outages[url] > 0 (uma falha por
+    chamada); "missing" responde 404 como um modelo inexistente.
+    """
+
+    outages = {}
+    calls = {}
+
+    def __init__(self, host=None):
+        self.host = host
+
+    def generate(self, model, prompt, options=None, keep_alive=None, stream=False):
+        FakeClient.calls[self.host] = FakeClient.calls.get(self.host, 0) + 1
+        if self.host == "missing":
+            raise ResponseError("model not found", 404)
+        if FakeClient.outages.get(self.host, 0) > 0:
+            FakeClient.outages[self.host] -= 1
+            raise ConnectionError("connection refused")
+        return {"response": f"ok de {self.host}"}
+
+@pytest.fixture(autouse=True)
+def fake_ollama(monkeypatch):
+    monkeypatch.setitem(sys.modules, "ollama", types.SimpleNamespace(Client=FakeClient))
+    monkeypatch.setattr(ollamaPool, "RETRY_DELAY", 0.05)
+    monkeypatch.setattr(ollamaPool, "MAX_RETRY_DELAY", 1.0)
+    monkeypatch.setattr(ollamaPool, "MAX_BACKOFF_WAIT", 0.3)
+    FakeClient.outages = {}
+    FakeClient.calls = {}
+
+def test_failover_to_healthy_host():
+    FakeClient.outages = {"a": 100}
+    pool = OllamaPool.from_specs(["a=1", "b=1"])
+    assert pool.generate("m", "p")["response"] == "ok de b"
+    assert pool.hosts[0].stats["failures"] == 1
+
+def test_client_error_is_not_retried():
+    pool = OllamaPool.from_specs(["missing"])
+    with pytest.raises(ResponseError):
+        pool.generate("m", "p")
+    assert FakeClient.calls == {"missing": 1}
+    assert pool.hosts[0].down_until == 0.0
+
+def test_short_outage_is_waited_out():
+    FakeClient.outages = {"a": 2}
+    pool = OllamaPool.from_specs(["a"])
+    assert pool.generate("m", "p")["response"] == "ok de a"
+    assert FakeClient.calls == {"a": 3}
+
+def test_long_outage_fails_fast():
+    FakeClient.outages = {"a": 100}
+    pool = OllamaPool.from_specs(["a"])
+    # Esgota as tentativas até o servidor ficar fora por mais que MAX_BACKOFF_WAIT.
+    for _ in range(5):
+        with pytest.raises((ConnectionError, OllamaUnavailable)):
+            pool.generate("m", "p")
+    started = time.monotonic()
+    with pytest.raises(OllamaUnavailable):
+        pool.generate("m", "p")
+    assert time.monotonic() - started < 0.1
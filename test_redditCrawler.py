@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+
+from insightsStore import BulkWriter, load_crawl_cursor, posts_needing_comments, save_crawl_cursor, setup_database
+from redditCrawler import PostListing, PostRecord, crawl_cursor
+
+def post(post_id, created_utc, num_comments=2):
+    return PostRecord(post_id, "OSCP", "texto", "https://reddit.com", created_utc, num_comments, 1)
+
+class FakeSubreddit:
+    """
+    Busca do subreddit com posts fixos, do mais novo para o mais antigo (sort="new").
+    """
+
+    def __init__(self, posts):
+        self.posts = sorted(posts, key=lambda record: record.created_utc, reverse=True)
+
+    def search(self, query, sort, time_filter, limit):
+        return [SimpleNamespace(**record._asdict()) for record in self.posts[:limit]]
+
+def listed(posts, since_utc):
+    listing = PostListing(FakeSubreddit(posts), "OSCP", since_utc=since_utc)
+    return [record.id for record in listing], listing.newest
+
+def test_listing_stops_at_cursor():
+    posts = [post(f"p{i}", 100 + i) for i in range(5)]
+    ids, newest = listed(posts, since_utc=102)
+    assert ids == ["p4", "p3"]
+    assert newest.id == "p4"
+
+def test_cursor_advances_to_newest_without_failures():
+    newest = post("p4", 104)
+    assert crawl_cursor(newest, []) == (104, "p4", False)
+    assert crawl_cursor(None, []) is None
+
+def test_failed_forest_is_listed_again(tmp_path):
+    conn = setup_database(tmp_path / "posts.db")
+    posts = [post(f"p{i}", 100 + i) for i in range(5)]
+    # Todos os posts foram gravados, mas as árvores de p1 e p2 falharam.
+    writer = BulkWriter(conn)
+    for record in posts:
+        writer.add_post(record)
+    for record in (posts[0], posts[3], posts[4]):
+        writer.add_forest(record, [])
+    writer.close()
+    save_crawl_cursor(conn, "OSCP", "OSCP", 90, "p0")
+    save_crawl_cursor(conn, "OSCP", "OSCP", *crawl_cursor(posts[4], [posts[1], posts[2]]))
+
+    since_utc, since_id = load_crawl_cursor(conn, "oscp", "OSCP")
+    assert since_id == "p1"
+    ids, _ = listed(posts, since_utc)
+    assert ids == ["p4", "p3", "p2", "p1"]
+    relisted = [record for record in posts if record.id in ids]
+    assert [record.id for record in posts_needing_comments(conn, relisted)] == ["p1", "p2"]
+
+def test_cursor_only_rewinds_for_failures(tmp_path):
+    conn = setup_database(tmp_path / "posts.db")
+    save_crawl_cursor(conn, "OSCP", "OSCP", 200, "p9")
+    save_crawl_cursor(conn, "OSCP", "OSCP", 150, "p5")
+    assert load_crawl_cursor(conn, "oscp", "OSCP") == (200, "p9")
+    # Na coleta completa, um post mais antigo que o cursor pode falhar: o cursor volta até ele.
+    cursor = crawl_cursor(post("p9", 200), [post("p1", 101)])
+    save_crawl_cursor(conn, "OSCP", "OSCP", *cursor)
+    assert load_crawl_cursor(conn, "oscp", "OSCP") == (100, "p1")
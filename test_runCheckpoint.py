@@ -0,0 +1,51 @@
+import pytest
+
+from runCheckpoint import RUN_FINISHED, RunCheckpoint, latest_unfinished_run
+
+def checkpoint(db_file, run_id="r1", exam="oscp"):
+    return RunCheckpoint(str(db_file), run_id, exam)
+
+def test_existing_run_is_only_reused_with_resume(tmp_path):
+    db_file = tmp_path / "posts.db"
+    first = checkpoint(db_file)
+    assert first.start({"token_budget": None}) is False
+    first.complete("analysis", "relatório")
+    first.close()
+
+    second = checkpoint(db_file)
+    with pytest.raises(ValueError):
+        second.start({"token_budget": 20000})
+    assert second.start(resume=True) is True
+    assert second.stage("analysis") == "relatório"
+    second.close()
+
+def test_chunks_resume_until_finished(tmp_path):
+    db_file = tmp_path / "posts.db"
+    run = checkpoint(db_file)
+    run.start()
+    assert run.save_chunk("map1", 0, "lote a") is None
+    assert run.save_chunk("map1", 1, "lote b") is None
+    run.save_output("map1", 0, "extração a")
+    run.complete("chunks:map1", "2")
+    assert list(run.iter_chunks("map1")) == [(0, "lote a", "extração a"), (1, "lote b", None)]
+    # Um lote que mudou perde a extração antiga.
+    assert run.save_chunk("map1", 0, "lote a") == "extração a"
+    assert run.save_chunk("map1", 0, "lote a2") is None
+    assert latest_unfinished_run(str(db_file), "oscp") == "r1"
+
+    run.finish()
+    assert run.conn.execute("SELECT COUNT(*) FROM run_chunks").fetchone()[0] == 0
+    assert run.conn.execute("SELECT status FROM runs").fetchone()[0] == RUN_FINISHED
+    assert latest_unfinished_run(str(db_file), "oscp") is None
+    run.close()
+
+def test_runs_are_separate_per_exam(tmp_path):
+    db_file = tmp_path / "posts.db"
+    oscp = checkpoint(db_file, exam="oscp")
+    cissp = checkpoint(db_file, exam="cissp")
+    oscp.start()
+    cissp.start()
+    oscp.complete("crawl")
+    assert cissp.stage("crawl") is None
+    oscp.close()
+    cissp.close()
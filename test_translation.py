@@ -0,0 +1,25 @@
+import pytest
+
+from translation import split_segments
+
+TEXTS = [
+    "",
+    "um parágrafo só",
+    "primeiro\n\nsegundo\n \n\nterceiro\n",
+    "título\n\n```\ncódigo\n\ncom linha em branco\n```\n\nfim",
+    "frase longa. " * 200,
+    ("linha\n" * 300) + "\n\n" + "x" * 5000,
+]
+
+@pytest.mark.parametrize("text", TEXTS)
+@pytest.mark.parametrize("max_chars", [50, 500, 4500])
+def test_split_segments_reconstructs_text(text, max_chars):
+    segments = split_segments(text, max_chars)
+    assert "".join(segment + separator for segment, separator in segments) == text
+    for segment, _ in segments:
+        assert len(segment) <= max_chars or segment.lstrip().startswith("```")
+
+def test_split_segments_keeps_code_blocks_whole():
+    text = "antes\n\n```\n" + "print(1)\n\n" * 100 + "```\n\ndepois"
+    segments = [segment for segment, _ in split_segments(text, 50)]
+    assert any(segment.startswith("```") and segment.endswith("```") for segment in segments)
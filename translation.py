@@ -0,0 +1,213 @@
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# deep-translator recusa textos com 5000 caracteres ou mais; deixamos margem.
+MAX_SEGMENT_CHARS = 4500
+
+# Palavras frequentes e pouco ambíguas usadas para detectar se um trecho já está em português.
+PORTUGUESE_WORDS = {
+    "de", "que", "não", "para", "com", "uma", "um", "os", "das", "dos", "você", "é", "mais",
+    "como", "seu", "sua", "também", "são", "ao", "pelo", "pela", "isso", "este", "esta",
+    "muito", "quando", "sobre", "exame", "estudo", "então", "foi", "há", "já", "ou", "nos",
+}
+ENGLISH_WORDS = {
+    "the", "and", "of", "to", "is", "that", "for", "with", "you", "this", "are", "on", "it",
+    "your", "was", "be", "have", "from", "they", "will", "study", "exam", "which", "or",
+}
+
+def make_google_backend(source="auto", target="pt"):
+    """
+    Cria um backend de tradução baseado no GoogleTranslator do deep-translator.
+    Cada thread reutiliza o seu próprio tradutor em vez de criar um por chamada.
+    """
+    from deep_translator import GoogleTranslator
+
+    local = threading.local()
+
+    def translate(text):
+        if not hasattr(local, "translator"):
+            local.translator = GoogleTranslator(source=source, target=target)
+        return local.translator.translate(text)
+
+    translate.name = f"google:{source}:{target}"
+    return translate
+
+def looks_portuguese(text):
+    """
+    Heurística leve de detecção de idioma: compara palavras frequentes de português e inglês.
+    """
+    words = re.findall(r"[a-záàâãéêíóôõúç]+", text.lower())
+    portuguese = sum(1 for word in words if word in PORTUGUESE_WORDS)
+    english = sum(1 for word in words if word in ENGLISH_WORDS)
+    return portuguese >= 2 and portuguese > 2 * english
+
+def needs_translation(segment):
+    """
+    Indica se o segmento tem texto a traduzir (ignora blocos de código, separadores e trechos
+    que já estão em português).
+    """
+    stripped = segment.strip()
+    if not re.search(r"[A-Za-zÀ-ÿ]", stripped) or stripped.startswith("```"):
+        return False
+    return not looks_portuguese(stripped)
+
+def split_segments(text, max_chars=MAX_SEGMENT_CHARS):
+    """
+    Divide o texto em segmentos nas fronteiras de parágrafo/markdown, cada um abaixo de max_chars.
+    Retorna uma lista de (segmento, separador); juntar segmento+separador reconstrói o texto.
+    Blocos de código (```) são mantidos inteiros.
+    """
+    parts = re.split(r"(\n\s*\n)", text)
+    blocks = []
+    in_code = False
+    for i in range(0, len(parts), 2):
+        paragraph = parts[i]
+        separator = parts[i + 1] if i + 1 < len(parts) else ""
+        if in_code:
+            previous, previous_separator = blocks[-1]
+            blocks[-1] = (previous + previous_separator + paragraph, separator)
+        else:
+            blocks.append((paragraph, separator))
+        if paragraph.count("```") % 2 == 1:
+            in_code = not in_code
+
+    segments = []
+    for paragraph, separator in blocks:
+        if len(paragraph) <= max_chars or paragraph.lstrip().startswith("```"):
+            segments.append((paragraph, separator))
+            continue
+        pieces = split_long_paragraph(paragraph, max_chars)
+        segments.extend(pieces[:-1])
+        segments.append((pieces[-1][0], separator))
+    return segments
+
+def split_long_paragraph(paragraph, max_chars):
+    """
+    Divide um parágrafo longo demais por linhas e, se preciso, em fim de frase ou no limite.
+    Retorna uma lista de (pedaço, separador) que reconstrói o parágrafo exatamente.
+    """
+    pieces = []
+    current = None
+    for line in paragraph.split("\n"):
+        while len(line) > max_chars:
+            cut = line.rfind(". ", 0, max_chars) + 1 or max_chars
+            if current is not None:
+                pieces.append((current, "\n"))
+                current = None
+            pieces.append((line[:cut], ""))
+            line = line[cut:]
+        if current is None:
+            current = line
+        elif len(current) + 1 + len(line) > max_chars:
+            pieces.append((current, "\n"))
+            current = line
+        else:
+            current = f"{current}\n{line}"
+    pieces.append((current, ""))
+    return pieces
+
+def setup_translation_cache(db_file):
+    """
+    Abre (e cria, se necessário) a tabela de traduções em cache no banco SQLite.
+    """
+    conn = sqlite3.connect(db_file, check_same_thread=False)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS translation_cache (
+            key TEXT PRIMARY KEY,
+            backend TEXT,
+            translated TEXT,
+            created_at REAL
+        );
+    ''')
+    conn.commit()
+    return conn
+
+def translate_document(text, backend, cache_conn=None, max_workers=4, max_chars=MAX_SEGMENT_CHARS,
+                       stats=None):
+    """
+    Traduz um documento segmento a segmento, em paralelo, preservando a formatação.
+    - backend é uma função texto -> texto (ex.: make_google_backend() ou um tradutor local).
+    - cache_conn é uma conexão de setup_translation_cache; segmentos já traduzidos são reutilizados.
+    Segmentos que falham são mantidos no idioma original; se stats (dicionário) for informado,
+    recebe o total de segmentos a traduzir ("pending") e quantos falharam ("failed").
+    """
+    backend_name = getattr(backend, "name", getattr(backend, "__name__", "backend"))
+    segments = split_segments(text, max_chars)
+
+    def key_for(segment):
+        return hashlib.sha256(f"{backend_name}\0{segment.strip()}".encode("utf-8")).hexdigest()
+
+    pending = {}
+    for segment, _ in segments:
+        if needs_translation(segment):
+            pending.setdefault(key_for(segment), segment.strip())
+
+    translated = {}
+    if cache_conn is not None and pending:
+        keys = list(pending)
+        for i in range(0, len(keys), 500):
+            batch = keys[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            for key, value in cache_conn.execute(
+                f"SELECT key, translated FROM translation_cache WHERE key IN ({placeholders})", batch
+            ):
+                translated[key] = value
+    missing = {key: segment for key, segment in pending.items() if key not in translated}
+    logging.info(f"Tradução: {len(segments)} segmentos, {len(pending)} a traduzir, "
+                 f"{len(pending) - len(missing)} em cache.")
+
+    def translate_one(item):
+        key, segment = item
+        try:
+            return key, backend(segment)
+        except Exception as e:
+            logging.error(f"Erro ao traduzir segmento ({len(segment)} caracteres): {e}")
+            return key, None
+
+    # Cada segmento traduzido é gravado assim que chega: se a tradução falhar ou o processo for
+    # interrompido no meio, a próxima execução só traduz o que faltou.
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for key, value in executor.map(translate_one, missing.items()):
+            if value is None:
+                failed += 1
+                continue
+            translated[key] = value
+            if cache_conn is not None:
+                cache_conn.execute('''
+                    INSERT OR REPLACE INTO translation_cache (key, backend, translated, created_at)
+                    VALUES (?, ?, ?, ?)
+                ''', (key, backend_name, value, time.time()))
+                cache_conn.commit()
+
+    if stats is not None:
+        stats.update(pending=len(pending), failed=failed)
+
+    output = []
+    for segment, separator in segments:
+        key = key_for(segment)
+        if key in translated:
+            # Preserva o espaçamento ao redor do segmento, que o tradutor descarta.
+            leading = segment[:len(segment) - len(segment.lstrip())]
+            trailing = segment[len(segment.rstrip()):]
+            segment = leading + translated[key] + trailing
+        output.append(segment + separator)
+    return "".join(output)
+
+def translate_to_portuguese(text, db_file=None, backend=None, max_workers=4, stats=None):
+    """
+    Traduz o texto para Português usando deep-translator (ou o backend informado),
+    com cache das traduções no banco SQLite db_file, se informado. stats: ver translate_document.
+    """
+    backend = backend or make_google_backend(source="auto", target="pt")
+    cache_conn = setup_translation_cache(db_file) if db_file else None
+    try:
+        return translate_document(text, backend, cache_conn, max_workers=max_workers, stats=stats)
+    finally:
+        if cache_conn is not None:
+            cache_conn.close()